@@ -0,0 +1,221 @@
+"""Micro-benchmarks for FlavorFinds. Run: python benchmarks.py [name ...]"""
+import subprocess
+import sys
+import tempfile
+import time
+
+COLD_START_SCRIPT = """
+import time
+t0 = time.perf_counter()
+import website
+from fastapi.testclient import TestClient
+t1 = time.perf_counter()
+with TestClient(website.create_app(website.AppConfig(data_dir={data_dir!r}))) as client:
+    assert client.get("/").status_code == 200
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t0)
+"""
+
+
+def bench_cold_start(runs=10):
+    """Time from `import website` to the first 200 on `/`, in a fresh interpreter."""
+    imports, firsts = [], []
+    with tempfile.TemporaryDirectory() as data_dir:
+        script = COLD_START_SCRIPT.format(data_dir=data_dir)
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+            t_import, t_first = map(float, out.stdout.split())
+            imports.append(t_import)
+            firsts.append(t_first)
+    print(f"cold_start: import {min(imports) * 1000:.1f} ms, "
+          f"first 200 on / {min(firsts) * 1000:.1f} ms (best of {runs})")
+
+
+def timeit(fn, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def synthetic_recipes(n):
+    """n recipes cycled from the seed data with unique ids and names."""
+    import website
+    seed = [r.model_dump() for r in website.iter_recipe_file(website.AppConfig().recipes_file)]
+    return [website.Recipe.model_construct(**{**seed[i % len(seed)], "id": i + 1,
+                                              "name": f"{seed[i % len(seed)]['name']} {i + 1}"})
+            for i in range(n)]
+
+
+def bench_serialization(n=5000, number=20):
+    """FastAPI's default encode path against FastJSONResponse, per route."""
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    import website
+
+    recipes = synthetic_recipes(n)
+    feedback = [{"name": "n", "email": "e@x.com", "rating": i % 5 + 1, "message": "m" * 80,
+                 "recipe_id": i, "timestamp": "2024-01-01T00:00:00"} for i in range(n)]
+    recipe_list = TypeAdapter(List[website.Recipe])
+
+    def default_recipes():
+        JSONResponse(jsonable_encoder(recipe_list.validate_python(recipes, from_attributes=True)))
+
+    def default_recipe():
+        JSONResponse(jsonable_encoder(website.Recipe.model_validate(recipes[0], from_attributes=True)))
+
+    def default_feedback():
+        JSONResponse(jsonable_encoder([website.Feedback(**item) for item in feedback]))
+
+    def fast_recipes():
+        website.FastJSONResponse(website.Catalogue(recipes).recipes_json)
+
+    def fast_recipe():
+        website.FastJSONResponse(recipes[0].model_dump())
+
+    def fast_feedback():
+        website.FastJSONResponse(feedback)
+
+    cases = [("/api/recipes", default_recipes, fast_recipes, 1),
+             ("/api/recipes/{id}", default_recipe, fast_recipe, 1000),
+             ("/api/feedback", default_feedback, fast_feedback, 1)]
+    print(f"serialization: {n} recipes / feedback entries, backends {sorted(website.JSON_BACKENDS)}")
+    for route, default, fast, scale in cases:
+        base = timeit(default, number * scale)
+        for backend in sorted(website.JSON_BACKENDS):
+            website.use_json_backend(backend)
+            t = timeit(fast, number * scale)
+            print(f"  {route:20} default {base * 1e3:8.3f} ms  {backend:7} {t * 1e3:8.3f} ms  x{base / t:.1f}")
+
+
+def bench_match(n=100_000, number=50):
+    """/api/recipes/match query time over a large catalogue."""
+    import website
+    start = time.perf_counter()
+    index = website.IngredientIndex(synthetic_recipes(n))
+    build = time.perf_counter() - start
+    print(f"match: {n} recipes, {len(index.terms)} terms, index build {build:.2f} s")
+    for have in (["eggs", "milk", "flour"], ["salt", "pepper", "garlic", "olive oil", "lemon"]):
+        t = timeit(lambda: index.match(have, 20), number)
+        print(f"  have={','.join(have):35} {t * 1e3:.3f} ms")
+
+
+def bench_similar(n=20_000):
+    """SimilarityIndex build time, incremental add and lookup."""
+    import website
+    recipes = synthetic_recipes(n)
+    start = time.perf_counter()
+    index = website.SimilarityIndex(recipes)
+    build = time.perf_counter() - start
+    new = website.Recipe.model_construct(**{**recipes[0].model_dump(), "id": n + 1})
+    add = timeit(lambda: index.with_changes([new]), 1)
+    lookup = timeit(lambda: index.similar(1, 10), 10_000)
+    print(f"similar: {n} recipes, build {build:.2f} s, add {add * 1e3:.2f} ms, lookup {lookup * 1e6:.2f} us")
+
+
+def bench_columns(n=100_000, number=20):
+    """RecipeColumns.select against a Python loop over the models."""
+    import website
+    recipes = synthetic_recipes(n)
+    columns = website.RecipeColumns(recipes)
+    columns.order("-rating")
+
+    def loop():
+        hits = [r for r in recipes if (website.parse_minutes(r.time) or float("inf")) <= 30
+                and r.rating >= 4.5 and r.calories is not None and r.calories <= 400]
+        hits.sort(key=lambda r: -r.rating)
+
+    def select():
+        columns.select(max_time=30, min_rating=4.5, max_calories=400, sort="-rating")
+
+    base, t = timeit(loop, number), timeit(select, number)
+    print(f"columns: {n} recipes, loop {base * 1e3:.2f} ms, select {t * 1e3:.2f} ms, x{base / t:.1f}")
+
+
+def bench_writes(n=100_000, batch=500, number=5):
+    """One recipe write as write_catalogue runs it: _next_catalogue, then save_recipe_file."""
+    import website
+    catalogue = website.Catalogue(synthetic_recipes(n))
+    catalogue.warm()
+    edits = [website.Recipe.model_construct(**{**r.model_dump(), "rating": 5.0})
+             for r in catalogue.recipes[:batch]]
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = f"{data_dir}/recipes.jsonl"
+        cases = [("single edit", lambda: website._next_catalogue(catalogue, edits[:1], ())),
+                 ("single delete", lambda: website._next_catalogue(catalogue, (), [edits[0].id])),
+                 (f"batch of {batch}", lambda: website._next_catalogue(catalogue, edits, ())),
+                 ("save_recipe_file", lambda: website.save_recipe_file(path, catalogue))]
+        print(f"writes: {n} recipes, fully warmed")
+        for name, fn in cases:
+            t = timeit(fn, number)
+            print(f"  {name:18} {t * 1e3:8.1f} ms")
+
+
+def bench_suggest(n=100_000, number=10_000):
+    """SuggestIndex build time and per-keystroke lookup."""
+    import website
+    recipes = synthetic_recipes(n)
+    start = time.perf_counter()
+    index = website.SuggestIndex(recipes)
+    build = time.perf_counter() - start
+    print(f"suggest: {n} recipes, {len(index.keys)} keys, {len(index.top)} precomputed prefixes, "
+          f"build {build:.2f} s")
+    for prefix in ("c", "chic", "classic pancakes 12", "zz"):
+        t = timeit(lambda: index.suggest(prefix, 10), number)
+        print(f"  prefix={prefix!r:24} {t * 1e6:.1f} us")
+
+
+def bench_mealplan(n=100_000, number=5):
+    """MealPlanner build time and an uncached week plan, with varied calories and ratings."""
+    import random
+    import website
+    rng = random.Random(0)
+    recipes = [website.Recipe.model_construct(**{**r.model_dump(), "calories": rng.randint(150, 900),
+                                                 "rating": round(rng.uniform(3, 5), 1)})
+               for r in synthetic_recipes(n)]
+    catalogue = website.Catalogue(recipes)
+    catalogue.columns
+    start = time.perf_counter()
+    planner = catalogue.meal_planner
+    build = time.perf_counter() - start
+    print(f"mealplan: {n} recipes, build {build:.2f} s, "
+          f"pools {sum(map(len, planner.pools.values()))} recipes")
+    for days, dessert in ((7, False), (14, True)):
+        t = timeit(lambda: planner._solve(1800, days, dessert), number)
+        print(f"  days={days:2} dessert={dessert!s:5} {t * 1e3:.1f} ms")
+
+
+def bench_shopping_list(n=100_000, ids=56, number=200):
+    """Ingredient pre-parse at load and a shopping-list merge over a fortnight of meals."""
+    from fastapi.testclient import TestClient
+    import website
+    catalogue = website.Catalogue(synthetic_recipes(n))
+    start = time.perf_counter()
+    catalogue.parsed_ingredients
+    parse = time.perf_counter() - start
+    app = website.create_app(website.AppConfig(response_cache_size=0))
+    app.state.catalogue = catalogue
+    client = TestClient(app)
+    query = {"recipes": ",".join(f"{i * 997 % n + 1}:{i % 3 + 1}" for i in range(ids))}
+    t = timeit(lambda: client.get("/api/shopping-list", params=query), number)
+    print(f"shopping_list: {n} recipes, parse {parse:.2f} s, {ids} recipes per request {t * 1e3:.2f} ms")
+
+
+BENCHMARKS = {
+    "cold_start": bench_cold_start,
+    "serialization": bench_serialization,
+    "match": bench_match,
+    "similar": bench_similar,
+    "columns": bench_columns,
+    "writes": bench_writes,
+    "suggest": bench_suggest,
+    "mealplan": bench_mealplan,
+    "shopping_list": bench_shopping_list,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
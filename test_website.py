@@ -0,0 +1,562 @@
+"""Behaviour tests for FlavorFinds. Run: python -m pytest -q"""
+import asyncio
+import csv
+import gc
+import io
+import json
+import math
+import random
+import shutil
+import threading
+from itertools import product
+
+import pytest
+from fastapi.testclient import TestClient
+
+import website
+
+ADMIN = {"X-Admin-Token": "t"}
+
+
+@pytest.fixture
+def catalogue():
+    catalogue = website.Catalogue(website.iter_recipe_file(website.AppConfig().recipes_file))
+    catalogue.warm()
+    return catalogue
+
+
+@pytest.fixture
+def client(tmp_path):
+    recipes_file = tmp_path / "recipes.jsonl"
+    shutil.copy(website.AppConfig().recipes_file, recipes_file)
+    config = website.AppConfig(data_dir=str(tmp_path), recipes_file=str(recipes_file), admin_token="t")
+    with TestClient(website.create_app(config), headers=ADMIN) as client:
+        yield client
+
+
+# ---------- Snapshot isolation ----------
+def test_with_changes_leaves_previous_snapshot_intact(catalogue):
+    recipes_json = catalogue.recipes_json
+    similar = {r.id: catalogue.similarity_index.similar(r.id, 10) for r in catalogue.recipes}
+    edited = catalogue.by_id[1].model_copy(update={"rating": 1.0})
+
+    catalogue.with_changes([edited], deletes=[2])
+
+    assert catalogue.recipes_json == recipes_json
+    assert catalogue.by_id[1].rating != 1.0
+    assert {r.id: catalogue.similarity_index.similar(r.id, 10) for r in catalogue.recipes} == similar
+
+
+def test_with_changes_matches_a_fresh_build(catalogue):
+    unrelated = catalogue.by_id[3].model_copy(update={
+        "ingredients": ["unobtainium"], "tags": [], "type": "Other", "difficulty": "Other"})
+    added = catalogue.by_id[1].model_copy(update={"id": 100})
+
+    updated = catalogue.with_changes([unrelated, added], deletes=[2])
+    fresh = website.Catalogue(updated.recipes)
+
+    assert updated.recipes_json == fresh.recipes_json
+    assert updated.parsed_ingredients == fresh.parsed_ingredients
+    for recipe in updated.recipes:
+        assert updated.similarity_index.similar(recipe.id, 10) == fresh.similarity_index.similar(recipe.id, 10)
+    assert all(other != 3 for r in updated.recipes for _, other in updated.similarity_index.similar(r.id, 10))
+    referrers = {}
+    for recipe_id, top in updated.similarity_index.neighbours.items():
+        for _, other in top:
+            referrers.setdefault(other, set()).add(recipe_id)
+    assert {k: v for k, v in updated.similarity_index.referrers.items() if v} == referrers
+
+
+def test_next_catalogue_leaves_expensive_views_lazy(catalogue):
+    edited = catalogue.by_id[1].model_copy(update={"rating": 1.0})
+    updated = website._next_catalogue(catalogue, [edited], ())
+    assert "page_parts" in updated.__dict__ and "similarity_index" in updated.__dict__
+    assert "suggest_index" not in updated.__dict__ and "columns" not in updated.__dict__
+
+
+# ---------- Delta sync ----------
+def test_change_log_merges_net_changes():
+    log = website.ChangeLog(1, max_entries=10)
+    log.record(2, [10], [], [])
+    log.record(3, [], [1], [])
+    log.record(4, [], [], [10, 2])
+
+    assert log.since(1, 4) == ([], [1], [2])
+    assert log.since(2, 4) == ([], [1], [10, 2])
+    assert log.since(1, 2) == ([10], [], [])
+    assert log.since(4, 4) == ([], [], [])
+    assert log.since(5, 4) is None
+
+
+def test_change_log_truncation_forces_full_snapshot():
+    log = website.ChangeLog(1, max_entries=2)
+    for version in range(2, 5):
+        log.record(version, [], [version], [])
+    assert log.since(1, 4) is None
+    assert log.since(2, 4) == ([], [3, 4], [])
+
+
+def test_changes_endpoint_across_delete_and_re_add(client):
+    full = client.get("/api/recipes/changes").json()
+    assert full["full"] and len(full["recipes"]) == 15
+    since = {"since": full["version"], "epoch": full["epoch"]}
+    recipe = next(r for r in full["recipes"] if r["id"] == 3)
+
+    assert client.delete("/api/recipes/3").status_code == 200
+    assert client.post("/api/recipes", json={**recipe, "name": "Back again"}).status_code == 201
+
+    delta = client.get("/api/recipes/changes", params=since).json()
+    assert not delta["full"]
+    assert delta["added"] == [] and delta["deleted"] == []
+    assert [r["name"] for r in delta["updated"]] == ["Back again"]
+
+    assert client.get("/api/recipes/changes", params={**since, "epoch": "other"}).json()["full"]
+
+
+def test_epoch_is_shared_by_processes_loading_the_same_file(tmp_path):
+    config = website.AppConfig(data_dir=str(tmp_path))
+    epochs = []
+    for _ in range(2):
+        with TestClient(website.create_app(config)) as client:
+            epochs.append(client.get("/api/recipes/changes").json()["epoch"])
+    assert epochs[0] == epochs[1] == website.file_epoch(config.recipes_file)
+    with TestClient(website.create_app(config)) as client:
+        delta = client.get("/api/recipes/changes", params={"since": 1, "epoch": epochs[0]}).json()
+    assert not delta["full"] and delta["updated"] == []
+
+
+def test_reload_starts_a_new_epoch(client):
+    before = client.get("/api/recipes/changes").json()
+    with open(client.app.state.config.recipes_file, "a") as f:
+        f.write(website.json_dumps({**before["recipes"][0], "id": 99}).decode() + "\n")
+    assert client.post("/api/admin/reload").status_code == 200
+    after = client.get("/api/recipes/changes", params={"since": before["version"], "epoch": before["epoch"]}).json()
+    assert after["full"] and after["version"] == 1 and after["epoch"] != before["epoch"]
+    assert len(after["recipes"]) == 16
+
+
+# ---------- Ingredient matching ----------
+def test_match_ranks_by_coverage(catalogue):
+    results = catalogue.ingredient_index.match(["flour", "milk", "eggs", "sugar"], 3)
+    assert results[0]["recipe"]["name"] == "Classic Pancakes"
+    assert [r["coverage"] for r in results] == sorted((r["coverage"] for r in results), reverse=True)
+    assert "baking powder" in results[0]["missing"]
+
+
+def test_match_normalises_quantities_and_plurals(catalogue):
+    index = catalogue.ingredient_index
+    assert index.query_mask(["2 cups Flour", "Eggs"]) == index.query_mask(["flour", "egg"])
+    assert index.match(["unobtainium"], 5) == []
+
+
+# ---------- Admission control ----------
+def test_route_gate_queues_then_rejects():
+    async def scenario():
+        gate = website.RouteGate(limit=1, max_queue=1, budget=1.0)
+        await gate.acquire()
+        queued = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(website.Overloaded):
+            await gate.acquire()
+        gate.release(0.01)
+        await queued
+        gate.release(0.01)
+        return gate.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 2 and stats["queued"] == 1 and stats["rejected"] == 1
+    assert stats["active"] == 0 and stats["waiting"] == 0
+
+
+def test_route_gate_passes_on_a_slot_when_a_waiter_is_cancelled():
+    async def scenario():
+        gate = website.RouteGate(limit=1, max_queue=2, budget=1.0)
+        await gate.acquire()
+        cancelled = asyncio.create_task(gate.acquire())
+        waiting = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        gate.release(0.01)
+        await waiting
+        gate.release(0.01)
+        return gate.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0 and stats["waiting"] == 0
+
+
+def test_route_gate_times_out_past_the_latency_budget():
+    async def scenario():
+        gate = website.RouteGate(limit=1, max_queue=1, budget=0.05)
+        gate.service_time = 0.01
+        await gate.acquire()
+        with pytest.raises(website.Overloaded):
+            await gate.acquire()
+        return gate.stats()
+
+    assert asyncio.run(scenario())["timed_out"] == 1
+
+
+def test_reads_and_writes_get_separate_gates():
+    admission = website.AdmissionController(website.AppConfig(read_concurrency=8, write_concurrency=2))
+    assert admission.gate("GET", "/api/recipes").limit == 8
+    assert admission.gate("POST", "/api/recipes").limit == 2
+
+
+# ---------- Columnar filtering ----------
+def make_recipe(recipe_id, **fields):
+    defaults = dict(name=f"Recipe {recipe_id}", type="Dinner", time="30 min", rating=4.0, img="", desc="",
+                    ingredients=[], steps=[])
+    return website.Recipe(id=recipe_id, **{**defaults, **fields})
+
+
+@pytest.mark.parametrize("text, minutes", [
+    ("20 min", 20), ("1 hour", 60), ("1 hr 30 min", 90), ("2h", 120), ("1.5 hours", 90),
+    ("1 day", 1440), ("45 Minutes", 45), ("overnight", None), ("", None),
+])
+def test_parse_minutes(text, minutes):
+    assert website.parse_minutes(text) == minutes
+
+
+def test_select_matches_a_plain_loop():
+    rng = random.Random(7)
+    recipes = [make_recipe(i, time=rng.choice(["10 min", "25 min", "1 hour", "1 hr 30 min", "a while"]),
+                           rating=round(rng.uniform(1, 5), 1), calories=rng.choice([None, *range(100, 900, 37)]),
+                           type=rng.choice(["Breakfast", "Dinner", "Dessert"]),
+                           difficulty=rng.choice(["Easy", "Medium", "Hard"]))
+               for i in range(2000)]
+    columns = website.RecipeColumns(recipes)
+    for _ in range(50):
+        query = dict(max_time=rng.choice([None, 10, 25, 59, 60, 90]),
+                     min_rating=rng.choice([None, 1.0, 3.3, 4.5, 5.0]),
+                     max_calories=rng.choice([None, 100, 433, 800]),
+                     type=rng.choice([None, "dinner", "Dessert", "Lunch"]),
+                     difficulty=rng.choice([None, "easy", "HARD"]))
+        expected = [i for i, r in enumerate(recipes)
+                    if (query["max_time"] is None or (website.parse_minutes(r.time) or math.inf) <= query["max_time"])
+                    and (query["min_rating"] is None or r.rating >= query["min_rating"])
+                    and (query["max_calories"] is None or (r.calories is not None
+                                                           and r.calories <= query["max_calories"]))
+                    and (query["type"] is None or r.type.lower() == query["type"].lower())
+                    and (query["difficulty"] is None or r.difficulty.lower() == query["difficulty"].lower())]
+        assert list(columns.select(**query)) == expected, query
+        by_rating = list(columns.select(**query, sort="-rating"))
+        assert sorted(by_rating) == expected
+        assert [recipes[i].rating for i in by_rating] == sorted((recipes[i].rating for i in expected), reverse=True)
+
+
+# ---------- Feedback export ----------
+def feedback_entries(count):
+    return [{"name": f"n{i}", "email": "e@x.com", "rating": i % 5 + 1,
+             "message": 'tricky, "quoted" ] } \\ text\nwith newline é' if i % 7 == 0 else "ok",
+             "recipe_id": i if i % 3 else None, "timestamp": f"2024-01-{i % 28 + 1:02d}T10:00:00"}
+            for i in range(count)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+def test_iter_feedback_across_chunk_boundaries(tmp_path, chunk_size):
+    path = tmp_path / "feedback.json"
+    entries = feedback_entries(200)
+    path.write_text(json.dumps(entries, indent=2))
+    assert list(website.iter_feedback(str(path), chunk_size=chunk_size)) == entries
+
+
+def test_iter_feedback_empty_and_missing(tmp_path):
+    path = tmp_path / "feedback.json"
+    assert list(website.iter_feedback(str(path))) == []
+    path.write_text("[]")
+    assert list(website.iter_feedback(str(path), chunk_size=1)) == []
+
+
+def test_csv_export_round_trips_with_since(tmp_path):
+    path = tmp_path / "feedback.json"
+    entries = feedback_entries(3000)
+    path.write_text(json.dumps(entries))
+    since = website.datetime(2024, 1, 20)
+    body = b"".join(website.export_feedback_csv(str(path), since, batch_size=100)).decode()
+    rows = list(csv.DictReader(io.StringIO(body)))
+    expected = [e for e in entries if e["timestamp"] >= "2024-01-20"]
+    assert len(rows) == len(expected)
+    assert [row["message"] for row in rows] == [e["message"] for e in expected]
+    assert rows[1]["recipe_id"] == str(expected[1]["recipe_id"] or "")
+
+
+def test_parquet_export_round_trips(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "feedback.json"
+    entries = feedback_entries(2500)
+    path.write_text(json.dumps(entries))
+    body = b"".join(website.export_feedback_parquet(str(path), batch_size=1000))
+    table = pq.read_table(io.BytesIO(body))
+    assert table.to_pylist() == entries
+
+
+def test_export_slot_released_even_if_never_sent():
+    slot = threading.BoundedSemaphore(1)
+    slot.acquire()
+    response = website.ExportResponse(iter([b"x"]), slot)
+    del response
+    gc.collect()
+    assert slot.acquire(blocking=False)
+
+
+def test_export_requires_admin_token(client):
+    assert client.get("/api/feedback/export", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.get("/api/feedback/export")
+    assert response.status_code == 200 and response.text.startswith("name,email,rating")
+
+
+# ---------- Feedback rate limiting ----------
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def feedback_payload(i, email="a@example.com"):
+    return {"name": "Ann", "email": email, "rating": 5, "message": f"note {i}", "timestamp": ""}
+
+
+def test_token_bucket_refills_at_rate():
+    clock = FakeClock()
+    limiter = website.TokenBucketLimiter(rate=0.5, burst=2, max_keys=10, clock=clock)
+    assert limiter.take("ip") == 0 and limiter.take("ip") == 0
+    assert limiter.take("ip") == pytest.approx(2.0)
+    clock.now += 1
+    assert limiter.take("ip") == pytest.approx(1.0)
+    clock.now += 1
+    assert limiter.take("ip") == 0
+    assert limiter.take("other") == 0
+
+
+def test_token_bucket_evicts_idlest_key():
+    limiter = website.TokenBucketLimiter(rate=1, burst=1, max_keys=2, clock=FakeClock())
+    for key in ("a", "b", "a", "c"):
+        limiter.take(key)
+    assert list(limiter.buckets) == ["a", "c"] and limiter.evictions == 1
+
+
+def test_duplicate_filter_forgets_after_window():
+    clock = FakeClock()
+    duplicates = website.DuplicateFilter(window=60, max_keys=10, clock=clock)
+    assert not duplicates.check(b"x")
+    assert duplicates.check(b"x")
+    clock.now += 61
+    assert not duplicates.check(b"x")
+
+
+def test_feedback_burst_gets_429_with_retry_after(client):
+    burst = website.AppConfig().feedback_burst
+    for i in range(burst):
+        assert client.post("/api/feedback", json=feedback_payload(i)).status_code == 200
+    response = client.post("/api/feedback", json=feedback_payload(burst, email="b@example.com"))
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/api/feedback/stats").json()["total_feedback"] == burst
+
+
+def test_duplicate_feedback_gets_429(client):
+    assert client.post("/api/feedback", json=feedback_payload(0)).status_code == 200
+    response = client.post("/api/feedback", json=feedback_payload(0, email=" A@Example.com "))
+    assert response.status_code == 429
+    assert response.json()["detail"] == "Duplicate feedback submission"
+
+
+# ---------- Suggestions ----------
+def test_suggest_matches_any_word_of_a_name(catalogue):
+    suggestions = catalogue.suggest_index.suggest("  PAN", 10)
+    assert {"text": "Classic Pancakes", "kind": "recipe", "id": 1} in suggestions
+    assert all(any(word.startswith("pan") for word in s["text"].lower().split()) for s in suggestions)
+
+
+def test_suggest_unknown_prefix_and_limit(catalogue):
+    index = catalogue.suggest_index
+    assert index.suggest("zzzz", 10) == []
+    assert index.suggest("", 3) == index.suggest("", 10)[:3]
+    assert len(index.suggest("", 3)) == 3
+
+
+def test_suggest_matches_brute_force():
+    rng = random.Random(7)
+    words = ["apple", "apricot", "app", "banana", "bread", "brisket", "a", "ab"]
+    recipes = [make_recipe(i, name=" ".join(rng.sample(words, 2)), rating=rng.randint(1, 50) / 10,
+                           tags=rng.sample(words, 1), ingredients=[rng.choice(words)])
+               for i in range(1, 200)]
+    index = website.SuggestIndex(recipes, k=3)
+    assert index.top
+    for prefix in ["", "a", "ap", "app", "appl", "b", "br", "bre", "x", "apple b"]:
+        sids = {sid for key, sid in zip(index.keys, index.sids) if key.startswith(prefix)}
+        ranked = sorted(sids, key=lambda sid: (-index.scores[sid], sid))[:3]
+        assert index.suggest(prefix, 3) == [index.suggestions[sid] for sid in ranked], prefix
+
+
+def test_suggest_endpoint(client):
+    response = client.get("/api/recipes/suggest", params={"prefix": "tira"})
+    assert response.status_code == 200
+    assert response.json()[0] == {"text": "Tiramisu", "kind": "recipe", "id": 15}
+    assert client.get("/api/recipes/suggest", params={"prefix": "a", "limit": 11}).status_code == 422
+
+
+# ---------- Response cache ----------
+def test_response_cache_drops_entries_from_older_versions():
+    cache = website.ResponseCache(10)
+    cache.put("k", 1, b"old", ttl=60)
+    assert cache.get("k", 1) == b"old"
+    assert cache.get("k", 2) is None
+    assert cache.stats()["invalidated"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_response_cache_expires_after_ttl():
+    clock = FakeClock()
+    cache = website.ResponseCache(10, clock=clock)
+    cache.put("k", 1, b"body", ttl=5)
+    clock.now += 4.9
+    assert cache.get("k", 1) == b"body"
+    clock.now += 0.1
+    assert cache.get("k", 1) is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = website.ResponseCache(2)
+    cache.put("a", 1, b"a", ttl=60)
+    cache.put("b", 1, b"b", ttl=60)
+    cache.get("a", 1)
+    cache.put("c", 1, b"c", ttl=60)
+    assert list(cache.entries) == ["a", "c"] and cache.stats()["evictions"] == 1
+
+
+def test_response_cache_byte_budget():
+    cache = website.ResponseCache(100, max_bytes=80)
+    cache.put("big", 1, b"x" * 11, ttl=60)
+    assert cache.stats()["oversized"] == 1 and "big" not in cache.entries
+    for key in "abcdefgh":
+        cache.put(key, 1, b"x" * 10, ttl=60)
+    cache.put("i", 1, b"x" * 10, ttl=60)
+    assert cache.bytes == 80 and list(cache.entries)[0] == "b"
+    cache.put("b", 1, b"y", ttl=60)
+    assert cache.bytes == 71
+
+
+def test_equivalent_queries_share_a_cache_entry(client):
+    cache = client.app.state.response_cache
+    first = client.get("/api/recipes", params={"type": "Dessert", "min_rating": "4.5"})
+    second = client.get("/api/recipes", params={"min_rating": "4.50", "type": "dessert", "utm": "x"})
+    assert first.content == second.content
+    assert cache.stats()["entries"] == 1 and cache.stats()["hits"] == 1
+
+
+def test_feedback_write_keeps_recipe_entries(client):
+    cache = client.app.state.response_cache
+    client.get("/api/recipes", params={"sort": "-rating"})
+    assert client.get("/api/feedback/stats").json()["total_feedback"] == 0
+    assert client.post("/api/feedback", json=feedback_payload(0)).status_code == 200
+    assert client.get("/api/feedback/stats").json()["total_feedback"] == 1
+    client.get("/api/recipes", params={"sort": "-rating"})
+    assert cache.stats()["hits"] == 1 and cache.stats()["invalidated"] == 1
+
+
+def test_recipe_write_invalidates_recipe_entries(client):
+    before = client.get("/api/recipes", params={"sort": "-rating"}).json()
+    recipe = dict(before[0], rating=0.5)
+    assert client.put(f"/api/recipes/{recipe['id']}", json=recipe).status_code == 200
+    after = client.get("/api/recipes", params={"sort": "-rating"}).json()
+    assert after[-1]["id"] == recipe["id"] and after[-1]["rating"] == 0.5
+
+
+# ---------- Meal planning ----------
+def random_meal_catalogue(seed, per_type=6):
+    rng = random.Random(seed)
+    types = ("Breakfast", "Lunch", "Dinner")
+    recipes = [make_recipe(i + 1, type=types[i % 3], rating=rng.randint(10, 50) / 10,
+                           calories=rng.choice([None] + list(range(100, 900, 50))))
+               for i in range(per_type * 3)]
+    catalogue = website.Catalogue(recipes)
+    catalogue.warm()
+    return catalogue
+
+
+def best_day_score(planner, budget, used):
+    pools = [[row for row, recipe in enumerate(planner.recipes)
+              if recipe.type.lower() == name and recipe.calories is not None and row not in used]
+             for name in website.MEAL_TYPES]
+    return max((sum(planner.scores[row] for row in rows) for rows in product(*pools)
+                if sum(planner.calories[row] for row in rows) <= budget), default=None)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_meal_plan_matches_brute_force(seed):
+    catalogue = random_meal_catalogue(seed)
+    planner = catalogue.meal_planner
+    used = set()
+    for rows in planner.plan(1500, 3):
+        assert [catalogue.recipes[row].type.lower() for row in rows] == list(website.MEAL_TYPES)
+        assert sum(planner.calories[row] for row in rows) <= 1500
+        assert not used & set(rows)
+        assert sum(planner.scores[row] for row in rows) == best_day_score(planner, 1500, used)
+        used.update(rows)
+
+
+def test_meal_plan_with_dessert_and_infeasible_budget(catalogue):
+    planner = catalogue.meal_planner
+    plan = planner.plan(1600, 2, dessert=True)
+    assert [[catalogue.recipes[row].type for row in rows] for rows in plan] == [
+        ["Breakfast", "Lunch", "Dinner", "Dessert"]] * 2
+    with pytest.raises(ValueError):
+        planner.plan(900, 1)
+    with pytest.raises(ValueError):
+        planner.plan(5000, 4)
+
+
+def test_meal_plan_endpoint(client):
+    response = client.get("/api/mealplan", params={"calories": 1200, "days": 2})
+    assert response.status_code == 200
+    days = response.json()["days"]
+    assert len(days) == 2 and all(day["calories"] <= 1200 for day in days)
+    ids = [meal["id"] for day in days for meal in day["meals"]]
+    assert len(ids) == len(set(ids)) == 6
+    assert client.get("/api/mealplan", params={"calories": 500}).status_code == 422
+    assert client.get("/api/mealplan", params={"calories": 1200, "days": 15}).status_code == 422
+
+
+# ---------- Shopping list ----------
+@pytest.mark.parametrize("text, quantity", [
+    ("2", 2.0), ("0.5", 0.5), ("1/2", 0.5), ("1 1/2", 1.5), ("½", 0.5), ("1 ½", 1.5), ("1/0", None),
+])
+def test_parse_quantity(text, quantity):
+    assert website.parse_quantity(text) == quantity
+
+
+@pytest.mark.parametrize("text, parsed", [
+    ("2 cups flour", (480.0, "ml", "flour")),
+    ("1 1/2 tbsp sugar", (22.5, "ml", "sugar")),
+    ("½ tsp salt", (2.5, "ml", "salt")),
+    ("400g spaghetti", (400.0, "g", "spaghetti")),
+    ("2 slices sourdough bread", (2.0, "slice", "sourdough bread")),
+    ("3 eggs", (3.0, "", "egg")),
+    ("salt", (None, None, "salt")),
+    ("1/0 cup milk", (None, None, "milk")),
+])
+def test_structured_ingredient(text, parsed):
+    assert website.structured_ingredient(text) == parsed
+
+
+def test_shopping_list_scales_and_merges(client):
+    response = client.get("/api/shopping-list", params={"recipes": "1, 3:2"})
+    assert response.status_code == 200
+    body = response.json()
+    items = {(entry["item"], entry["unit"]): entry for entry in body["items"]}
+    assert body["recipes"] == 2
+    assert items["milk", "ml"]["quantity"] == 240 + 2 * 120
+    assert items["egg", ""]["quantity"] == 2 + 2 * 2
+    assert items["egg", ""]["recipes"] == [1, 3]
+    assert items["flour", "ml"]["recipes"] == [1]
+
+
+@pytest.mark.parametrize("recipes, status", [
+    ("1:nan", 422), ("1:inf", 422), ("1:-1", 422), ("1:0", 422), ("x", 422), (",", 422), ("999", 404),
+])
+def test_shopping_list_rejects_bad_input(client, recipes, status):
+    assert client.get("/api/shopping-list", params={"recipes": recipes}).status_code == status
@@ -1,17 +1,79 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from starlette.routing import Match
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from functools import cached_property, lru_cache
+from itertools import compress
+from operator import attrgetter
+from array import array
+from bisect import bisect_left, bisect_right
 import uvicorn
 from datetime import datetime
+import asyncio
+import csv
+import hashlib
+import heapq
+import html
+import io
 import json
+import math
+import mmap
 import os
+import random
+import re
 import socket
-
-app = FastAPI(title="FlavorFinds", version="2.0")
-
-# Create data directory for feedback
-os.makedirs("data", exist_ok=True)
+import threading
+import time
+import weakref
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# ---------- Configuration ----------
+class AppConfig(BaseModel):
+    data_dir: str = "data"
+    recipes_file: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recipes.jsonl")
+    # Seconds between checks of recipes_file for changes; 0 disables the watcher.
+    reload_interval: float = 0
+    # When set, admin endpoints require a matching X-Admin-Token header.
+    admin_token: Optional[str] = None
+    max_concurrent_exports: int = 2
+    # Feedback write path: per-IP and per-email token buckets, plus a window
+    # in which byte-identical submissions are dropped.
+    feedback_per_minute: float = 6
+    feedback_burst: int = 5
+    feedback_duplicate_window: float = 60
+    limiter_max_keys: int = 10000
+    response_cache_size: int = 1024
+    response_cache_bytes: int = 64 << 20
+    change_log_size: int = 1000
+    # Admission control: per-route concurrency, wait-queue length and the
+    # longest expected queueing delay (seconds) before a request gets a 503.
+    read_concurrency: int = 64
+    read_queue: int = 256
+    read_latency_budget: float = 0.5
+    write_concurrency: int = 4
+    write_queue: int = 16
+    write_latency_budget: float = 2.0
+    # Per-route concurrency overrides keyed by route path, e.g. {"/api/feedback": 2}.
+    route_concurrency: Dict[str, int] = {}
+
+    @property
+    def feedback_file(self):
+        return os.path.join(self.data_dir, "feedback.json")
 
 
 # ---------- Data Models ----------
@@ -30,6 +92,11 @@ class Recipe(BaseModel):
     tags: List[str] = []
 
 
+class RecipeBatch(BaseModel):
+    upsert: List[Recipe] = []
+    delete: List[int] = []
+
+
 class Feedback(BaseModel):
     name: str
     email: str
@@ -39,237 +106,1078 @@ class Feedback(BaseModel):
     timestamp: str
 
 
-# ---------- Enhanced Sample Data with More Recipes ----------
-recipes_db = [
-    # Breakfast Recipes
-    Recipe(
-        id=1,
-        name="Classic Pancakes",
-        type="Breakfast",
-        time="20 min",
-        rating=4.7,
-        img="https://images.unsplash.com/photo-1567620905732-2d1ec7ab7445?w=300",
-        desc="Fluffy golden pancakes with maple syrup and fresh berries.",
-        ingredients=["2 cups flour", "1 cup milk", "2 eggs", "2 tbsp sugar", "1 tbsp baking powder",
-                     "1 tsp vanilla extract"],
-        steps=["Mix dry ingredients", "Add wet ingredients", "Whisk until smooth", "Cook on medium heat",
-               "Flip when bubbles form", "Serve with syrup"],
-        difficulty="Easy",
-        calories=320,
-        tags=["vegetarian", "quick", "family-friendly", "sweet"]
-    ),
-    Recipe(
-        id=2,
-        name="Avocado Toast",
-        type="Breakfast",
-        time="10 min",
-        rating=4.5,
-        img="https://images.unsplash.com/photo-1541519227354-08fa5d50c44d?w=300",
-        desc="Healthy smashed avocado on sourdough with seasonings.",
-        ingredients=["2 slices sourdough bread", "1 ripe avocado", "1 lime", "salt", "pepper", "red pepper flakes",
-                     "olive oil"],
-        steps=["Toast bread until golden", "Mash avocado with lime juice", "Season with salt and pepper",
-               "Spread on toast", "Drizzle with olive oil"],
-        difficulty="Easy",
-        calories=280,
-        tags=["vegan", "healthy", "quick", "gluten-free"]
-    ),
-    Recipe(
-        id=3,
-        name="French Toast",
-        type="Breakfast",
-        time="15 min",
-        rating=4.6,
-        img="https://images.unsplash.com/photo-1484723091739-30a097e8f929?w=300",
-        desc="Golden brown French toast with cinnamon and maple syrup.",
-        ingredients=["4 slices bread", "2 eggs", "1/2 cup milk", "1 tsp cinnamon", "1 tsp vanilla", "2 tbsp butter"],
-        steps=["Whisk eggs, milk, cinnamon, vanilla", "Dip bread slices", "Cook in butter until golden",
-               "Serve with syrup"],
-        difficulty="Easy",
-        calories=350,
-        tags=["sweet", "comfort-food", "family"]
-    ),
-    Recipe(
-        id=4,
-        name="Vegetable Omelette",
-        type="Breakfast",
-        time="15 min",
-        rating=4.4,
-        img="https://images.unsplash.com/photo-1551782450-17144efb9c50?w=300",
-        desc="Fluffy omelette filled with fresh vegetables and cheese.",
-        ingredients=["3 eggs", "1/4 cup bell peppers", "1/4 cup onions", "1/4 cup mushrooms", "1/4 cup cheese", "salt",
-                     "pepper"],
-        steps=["Chop vegetables", "Whisk eggs with seasoning", "Cook vegetables", "Add eggs and cook",
-               "Fold and serve"],
-        difficulty="Medium",
-        calories=280,
-        tags=["protein", "healthy", "low-carb"]
-    ),
-
-    # Lunch Recipes
-    Recipe(
-        id=5,
-        name="Caesar Salad",
-        type="Lunch",
-        time="15 min",
-        rating=4.3,
-        img="https://images.unsplash.com/photo-1546793665-c74683f339c1?w=300",
-        desc="Classic Caesar salad with crispy romaine and homemade dressing.",
-        ingredients=["Romaine lettuce", "Parmesan cheese", "Croutons", "Anchovies", "Lemon juice", "Olive oil",
-                     "Garlic"],
-        steps=["Chop lettuce", "Make dressing", "Toss with croutons", "Add Parmesan", "Serve immediately"],
-        difficulty="Easy",
-        calories=320,
-        tags=["healthy", "fresh", "quick-lunch"]
-    ),
-    Recipe(
-        id=6,
-        name="Chicken Wrap",
-        type="Lunch",
-        time="10 min",
-        rating=4.5,
-        img="https://images.unsplash.com/photo-1565299624946-b28f40a0ca4b?w=300",
-        desc="Grilled chicken wrap with fresh vegetables and sauce.",
-        ingredients=["Tortilla wrap", "Grilled chicken", "Lettuce", "Tomato", "Cucumber", "Mayonnaise", "Cheese"],
-        steps=["Warm tortilla", "Layer ingredients", "Roll tightly", "Cut in half", "Serve"],
-        difficulty="Easy",
-        calories=380,
-        tags=["protein", "portable", "quick"]
-    ),
-    Recipe(
-        id=7,
-        name="Quinoa Bowl",
-        type="Lunch",
-        time="20 min",
-        rating=4.6,
-        img="https://images.unsplash.com/photo-1512621776951-a57141f2eefd?w=300",
-        desc="Nutritious quinoa bowl with roasted vegetables and tahini dressing.",
-        ingredients=["Quinoa", "Sweet potato", "Broccoli", "Chickpeas", "Tahini", "Lemon", "Olive oil"],
-        steps=["Cook quinoa", "Roast vegetables", "Make dressing", "Combine all ingredients", "Garnish with herbs"],
-        difficulty="Medium",
-        calories=420,
-        tags=["vegan", "healthy", "meal-prep"]
-    ),
-
-    # Dinner Recipes
-    Recipe(
-        id=8,
-        name="Spaghetti Carbonara",
-        type="Dinner",
-        time="30 min",
-        rating=4.8,
-        img="https://images.unsplash.com/photo-1621996346565-e3dbc353d2e5?w=300",
-        desc="Creamy Italian pasta with crispy bacon and Parmesan cheese.",
-        ingredients=["400g spaghetti", "200g bacon", "3 eggs", "100g Parmesan", "black pepper", "garlic"],
-        steps=["Cook pasta", "Fry bacon until crispy", "Mix eggs and cheese", "Combine everything off heat",
-               "Add pepper"],
-        difficulty="Medium",
-        calories=450,
-        tags=["pasta", "italian", "comfort-food", "creamy"]
-    ),
-    Recipe(
-        id=9,
-        name="Grilled Salmon",
-        type="Dinner",
-        time="25 min",
-        rating=4.7,
-        img="https://images.unsplash.com/photo-1467003909585-2f8a72700288?w=300",
-        desc="Perfectly grilled salmon with lemon and herbs.",
-        ingredients=["Salmon fillets", "Lemon", "Olive oil", "Garlic", "Dill", "Salt", "Pepper"],
-        steps=["Season salmon", "Preheat grill", "Grill 4-6 minutes per side", "Squeeze lemon", "Garnish with dill"],
-        difficulty="Medium",
-        calories=350,
-        tags=["seafood", "healthy", "protein", "low-carb"]
-    ),
-    Recipe(
-        id=10,
-        name="Beef Stir Fry",
-        type="Dinner",
-        time="20 min",
-        rating=4.4,
-        img="https://images.unsplash.com/photo-1603133872878-684f208fb84b?w=300",
-        desc="Quick and flavorful beef stir fry with vegetables.",
-        ingredients=["Beef strips", "Bell peppers", "Broccoli", "Soy sauce", "Ginger", "Garlic", "Sesame oil"],
-        steps=["Slice beef and vegetables", "Stir-fry beef", "Add vegetables", "Add sauce", "Serve over rice"],
-        difficulty="Medium",
-        calories=380,
-        tags=["asian", "quick", "protein-rich"]
-    ),
-    Recipe(
-        id=11,
-        name="Vegetable Curry",
-        type="Dinner",
-        time="35 min",
-        rating=4.5,
-        img="https://images.unsplash.com/photo-1455855748-9c949ab5daf1?w=300",
-        desc="Spicy vegetable curry with coconut milk and aromatic spices.",
-        ingredients=["Mixed vegetables", "Coconut milk", "Curry paste", "Onion", "Garlic", "Ginger", "Basil"],
-        steps=["Sauté onions", "Add curry paste", "Add vegetables", "Add coconut milk", "Simmer until tender"],
-        difficulty="Medium",
-        calories=320,
-        tags=["vegan", "spicy", "comfort-food"]
-    ),
-
-    # Dessert Recipes
-    Recipe(
-        id=12,
-        name="Chocolate Brownies",
-        type="Dessert",
-        time="45 min",
-        rating=4.9,
-        img="https://images.unsplash.com/photo-1606313564200-e75d5e30476c?w=300",
-        desc="Rich, fudgy chocolate brownies with walnuts.",
-        ingredients=["Butter", "Sugar", "Eggs", "Flour", "Cocoa powder", "Chocolate chips", "Walnuts"],
-        steps=["Melt butter and chocolate", "Mix ingredients", "Bake at 350°F", "Cool before cutting"],
-        difficulty="Easy",
-        calories=420,
-        tags=["chocolate", "sweet", "baking"]
-    ),
-    Recipe(
-        id=13,
-        name="Berry Cheesecake",
-        type="Dessert",
-        time="4 hours",
-        rating=4.8,
-        img="https://images.unsplash.com/photo-1567306301408-9b74779a11af?w=300",
-        desc="Creamy cheesecake with fresh berry topping.",
-        ingredients=["Cream cheese", "Sugar", "Eggs", "Graham crackers", "Butter", "Mixed berries", "Whipped cream"],
-        steps=["Make crust", "Prepare filling", "Bake in water bath", "Chill overnight", "Add berry topping"],
-        difficulty="Hard",
-        calories=380,
-        tags=["cheesecake", "berries", "special-occasion"]
-    ),
-    Recipe(
-        id=14,
-        name="Apple Pie",
-        type="Dessert",
-        time="1 hour",
-        rating=4.7,
-        img="https://images.unsplash.com/photo-1535920527002-b35e96722206?w=300",
-        desc="Classic American apple pie with cinnamon and nutmeg.",
-        ingredients=["Apples", "Pie crust", "Sugar", "Cinnamon", "Nutmeg", "Butter", "Lemon juice"],
-        steps=["Peel and slice apples", "Mix with spices", "Fill pie crust", "Bake until golden",
-               "Cool before serving"],
-        difficulty="Medium",
-        calories=350,
-        tags=["pie", "classic", "baking"]
-    ),
-    Recipe(
-        id=15,
-        name="Tiramisu",
-        type="Dessert",
-        time="6 hours",
-        rating=4.9,
-        img="https://images.unsplash.com/photo-1571877227200-a0d98ea607e9?w=300",
-        desc="Classic Italian tiramisu with coffee and mascarpone.",
-        ingredients=["Ladyfingers", "Coffee", "Mascarpone", "Eggs", "Sugar", "Cocoa powder"],
-        steps=["Brew strong coffee", "Make mascarpone cream", "Layer ladyfingers and cream", "Dust with cocoa",
-               "Chill for 6 hours"],
-        difficulty="Hard",
-        calories=320,
-        tags=["italian", "coffee", "no-bake"]
-    )
-]
+# ---------- JSON Serialization ----------
+# Routes return FastJSONResponse directly, which skips response_model
+# revalidation and jsonable_encoder for data we already trust, so they
+# declare no response_model.
+def _stdlib_dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+JSON_BACKENDS = {"stdlib": _stdlib_dumps}
+if orjson is not None:
+    JSON_BACKENDS["orjson"] = orjson.dumps
+
+json_dumps = JSON_BACKENDS.get("orjson", _stdlib_dumps)
+
+
+def use_json_backend(name):
+    global json_dumps
+    json_dumps = JSON_BACKENDS[name]
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, bytes):
+            return content
+        return json_dumps(content)
+
+
+# ---------- Response Cache ----------
+class ResponseCache:
+    """LRU cache of rendered JSON bodies with per-entry TTL and a byte budget.
+
+    Each entry is tagged with the version of the data it was built from; a
+    lookup under a newer version drops it, so writes invalidate everything
+    derived from the old data without tracking which keys they touch.
+    Bodies larger than an eighth of `max_bytes` are not cached at all, so a
+    few full-catalogue responses cannot crowd out everything else.
+    """
+
+    def __init__(self, max_entries, max_bytes=64 << 20, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidated": 0,
+                         "oversized": 0}
+
+    def _drop(self, key):
+        self.bytes -= len(self.entries.pop(key)[2])
+
+    def get(self, key, version):
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires, entry_version, body = entry
+            if entry_version != version:
+                self.counters["invalidated"] += 1
+                self._drop(key)
+            elif expires <= self.clock():
+                self.counters["expired"] += 1
+                self._drop(key)
+            else:
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return body
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, key, version, body, ttl):
+        if len(body) > self.max_bytes // 8:
+            self.counters["oversized"] += 1
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (self.clock() + ttl, version, body)
+        self.bytes += len(body)
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._drop(next(iter(self.entries)))
+            self.counters["evictions"] += 1
+
+    def stats(self):
+        return {**self.counters, "entries": len(self.entries), "bytes": self.bytes}
+
+
+# ---------- Catalogue ----------
+class Catalogue:
+    """Immutable snapshot of the recipe catalogue and its lookups.
+
+    Writers never modify a published snapshot: ``with_changes`` builds the
+    next one and the app publishes it with a single reference swap. All
+    snapshots descended from one load share an ``epoch`` (the file's
+    content hash, see file_epoch), so a client's version number is only
+    meaningful within that epoch.
+    """
+
+    # Derived views, cheapest first: the first three are all that `/` and a
+    # plain /api/recipes need.
+    VIEWS = ("positions", "recipes_json", "page_parts", "parsed_ingredients", "columns", "ingredient_index",
+             "suggest_index", "meal_planner", "similarity_index")
+
+    def __init__(self, recipes, version=1, by_id=None, epoch=None):
+        self.recipes = list(recipes)
+        self.by_id = {r.id: r for r in self.recipes} if by_id is None else by_id
+        self.version = version
+        self.epoch = os.urandom(8).hex() if epoch is None else epoch
+        self._building = {}
+
+    @cached_property
+    def positions(self):
+        return {r.id: i for i, r in enumerate(self.recipes)}
+
+    def with_changes(self, upserts=(), deletes=()):
+        """Next snapshot with `upserts` added or replaced and `deletes` removed.
+
+        Updated recipes keep their position, new ones are appended. Cached
+        per-row JSON and parsed ingredients are carried over for untouched
+        recipes, and a built similarity index is updated incrementally
+        rather than rebuilt.
+        """
+        upserts = list({r.id: r for r in upserts}.values())
+        by_id = dict(self.by_id)
+        for recipe_id in deletes:
+            del by_id[recipe_id]
+        for recipe in upserts:
+            by_id[recipe.id] = recipe
+        catalogue = Catalogue(by_id.values(), version=self.version + 1, by_id=by_id, epoch=self.epoch)
+        changed = set(deletes).union(r.id for r in upserts)
+        if deletes:
+            if "recipe_json_rows" in self.__dict__:
+                rows = {r.id: row for r, row in zip(self.recipes, self.recipe_json_rows) if r.id not in changed}
+                catalogue.recipe_json_rows = [rows.get(r.id) or json_dumps(r.model_dump())
+                                              for r in catalogue.recipes]
+        else:
+            # Positions are stable without deletes: patch rows in place of a rebuild.
+            positions = dict(self.positions)
+            rows = list(self.recipe_json_rows) if "recipe_json_rows" in self.__dict__ else None
+            for recipe in upserts:
+                position = positions.setdefault(recipe.id, len(positions))
+                if rows is not None:
+                    row = json_dumps(recipe.model_dump())
+                    if position == len(rows):
+                        rows.append(row)
+                    else:
+                        rows[position] = row
+            catalogue.positions = positions
+            if rows is not None:
+                catalogue.recipe_json_rows = rows
+        if "parsed_ingredients" in self.__dict__:
+            parsed = dict(self.parsed_ingredients)
+            for recipe_id in deletes:
+                del parsed[recipe_id]
+            for recipe in upserts:
+                parsed[recipe.id] = tuple(map(structured_ingredient, recipe.ingredients))
+            catalogue.parsed_ingredients = parsed
+        if "similarity_index" in self.__dict__:
+            catalogue.similarity_index = self.similarity_index.with_changes(upserts, deletes)
+        return catalogue
+
+    @cached_property
+    def recipe_json_rows(self):
+        return [json_dumps(r.model_dump()) for r in self.recipes]
+
+    @cached_property
+    def recipes_json(self):
+        return self.rows_json(range(len(self.recipes)))
+
+    def rows_json(self, rows):
+        """Serialise recipes by row position from the cached per-row JSON."""
+        return b"[" + b",".join(map(self.recipe_json_rows.__getitem__, rows)) + b"]"
+
+    @cached_property
+    def columns(self):
+        return RecipeColumns(self.recipes)
+
+    @cached_property
+    def ingredient_index(self):
+        return IngredientIndex(self.recipes)
+
+    @cached_property
+    def parsed_ingredients(self):
+        """Recipe id -> tuple of structured_ingredient() results, one per line."""
+        return {r.id: tuple(map(structured_ingredient, r.ingredients)) for r in self.recipes}
+
+    @cached_property
+    def similarity_index(self):
+        return SimilarityIndex(self.recipes)
+
+    @cached_property
+    def meal_planner(self):
+        return MealPlanner(self)
+
+    @cached_property
+    def suggest_index(self):
+        return SuggestIndex(self.recipes)
+
+    @cached_property
+    def page_parts(self):
+        return render_page_parts(self)
+
+    def warm(self, views=VIEWS):
+        """Build the derived views up front instead of on first request."""
+        for name in views:
+            getattr(self, name)
+
+    def building(self, name):
+        """Future for the view `name`, starting its build in the executor if needed.
+
+        Each view gets one future per snapshot, so concurrent requests share a
+        build and never run it on the event loop. Failed builds are logged and
+        forgotten, so the next request retries.
+        """
+        future = self._building.get(name)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if name in self.__dict__:
+                future = loop.create_future()
+                future.set_result(self.__dict__[name])
+            else:
+                future = loop.run_in_executor(None, getattr, self, name)
+                future.add_done_callback(lambda f: self._build_done(name, f))
+            self._building[name] = future
+        return future
+
+    def _build_done(self, name, future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error building {name}: {future.exception()}")
+            self._building.pop(name, None)
+
+    async def view(self, name):
+        """The view `name`, waiting for its build (and only its build) if needed."""
+        if name in self.__dict__:
+            return self.__dict__[name]
+        return await asyncio.shield(self.building(name))
+
+
+def iter_recipe_file(path):
+    """Stream recipes from a JSON Lines file, one validated Recipe per line.
+
+    The file is memory-mapped and parsed line by line, so even very large
+    catalogues are never read into a single Python string.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for line in iter(m.readline, b""):
+                if line.strip():
+                    yield Recipe.model_validate_json(line)
+
+
+def load_catalogue(path):
+    """Load and fully warm a catalogue; meant to run off the event loop."""
+    catalogue = Catalogue(iter_recipe_file(path), epoch=file_epoch(path))
+    catalogue.warm()
+    return catalogue
+
+
+def save_recipe_file(path, catalogue):
+    """Atomically replace the JSON Lines catalogue file with `catalogue`."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        for row in catalogue.recipe_json_rows:
+            f.write(row + b"\n")
+    os.replace(tmp_path, path)
+
+
+async def reload_catalogue(app, if_changed=False):
+    """Rebuild the catalogue in a worker thread and swap it in atomically.
+
+    Readers keep whichever snapshot they already hold; the swap is a single
+    attribute assignment, so nobody sees a half-built catalogue. With
+    `if_changed`, returns None when the file is the one last loaded or written.
+    """
+    async with app.state.write_lock:
+        path = app.state.config.recipes_file
+        signature = _file_signature(path)
+        if if_changed and signature == app.state.recipes_file_signature:
+            return None
+        app.state.recipes_file_signature = signature
+        # A reloaded file starts a new epoch at version 1, exactly what any
+        # other process loading the same file gets; clients resync in full.
+        catalogue = await asyncio.get_running_loop().run_in_executor(None, load_catalogue, path)
+        app.state.change_log = ChangeLog(catalogue.version, app.state.config.change_log_size)
+        app.state.catalogue = catalogue
+        return catalogue
+
+
+def _next_catalogue(current, upserts, deletes):
+    """Apply an edit off the event loop, ready for the first-paint route.
+
+    with_changes carries per-row JSON, parsed ingredients and the similarity
+    index over incrementally; every other view stays lazy and is built
+    off-loop by Catalogue.view on first use, so an edit never pays for a
+    full rebuild.
+    """
+    catalogue = current.with_changes(upserts, deletes)
+    catalogue.warm(("positions", "page_parts"))
+    return catalogue
+
+
+async def write_catalogue(app, upserts=(), deletes=(), check=None):
+    """Apply recipe edits as one new snapshot, persist it, then publish it.
+
+    `check` runs against the current snapshot under the write lock and may
+    raise to reject the edit.
+    """
+    async with app.state.write_lock:
+        current = app.state.catalogue
+        if check is not None:
+            check(current)
+        path = app.state.config.recipes_file
+        loop = asyncio.get_running_loop()
+        # Build and warm the next snapshot off the event loop, like a reload.
+        catalogue = await loop.run_in_executor(None, _next_catalogue, current, upserts, deletes)
+        await loop.run_in_executor(None, save_recipe_file, path, catalogue)
+        # Our own write must not look like an external edit to the watcher.
+        app.state.recipes_file_signature = _file_signature(path)
+        upserted = {r.id for r in upserts}
+        app.state.change_log.record(catalogue.version,
+                                    [i for i in upserted if i not in current.by_id],
+                                    [i for i in upserted if i in current.by_id],
+                                    [i for i in deletes if i not in upserted])
+        app.state.catalogue = catalogue
+        return catalogue
+
+
+def file_epoch(path):
+    """Content hash of the recipes file, used as the epoch of catalogues loaded from it.
+
+    Every process that loads the same file agrees on the epoch, so delta
+    sync survives restarts, rolling deploys and multiple workers.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+async def watch_recipes_file(app, interval):
+    """Poll recipes_file and hot-reload the catalogue when it changes."""
+    path = app.state.config.recipes_file
+    while True:
+        await asyncio.sleep(interval)
+        signature = _file_signature(path)
+        if signature is None or signature == app.state.recipes_file_signature:
+            continue
+        try:
+            catalogue = await reload_catalogue(app, if_changed=True)
+            if catalogue is None:
+                continue
+            print(f"Reloaded {len(catalogue.recipes)} recipes (version {catalogue.version})")
+        except Exception as e:
+            print(f"Error reloading recipes: {e}")
+
+# ---------- Change Log ----------
+class ChangeLog:
+    """Recipe ids added, updated and deleted by each catalogue version.
+
+    Only the newest `max_entries` versions are kept; ``floor`` is the oldest
+    version a delta can still be computed from, and clients further behind
+    get a full snapshot instead.
+    """
+
+    def __init__(self, version, max_entries):
+        self.floor = version
+        self.max_entries = max_entries
+        self.entries = deque()
+
+    def record(self, version, added, updated, deleted):
+        self.entries.append((version, added, updated, deleted))
+        while len(self.entries) > self.max_entries:
+            self.floor = self.entries.popleft()[0]
+
+    def since(self, version, current):
+        """Net (added, updated, deleted) ids from `version` to `current`, or None if out of range."""
+        if not self.floor <= version <= current:
+            return None
+        existed, exists = {}, {}
+        for entry_version, added, updated, deleted in self.entries:
+            if not version < entry_version <= current:
+                continue
+            for recipe_id in added:
+                existed.setdefault(recipe_id, False)
+                exists[recipe_id] = True
+            for recipe_id in updated:
+                existed.setdefault(recipe_id, True)
+                exists[recipe_id] = True
+            for recipe_id in deleted:
+                existed.setdefault(recipe_id, True)
+                exists[recipe_id] = False
+        return ([i for i, now in exists.items() if now and not existed[i]],
+                [i for i, now in exists.items() if now and existed[i]],
+                [i for i, now in exists.items() if not now and existed[i]])
+
+    def stats(self):
+        return {"floor": self.floor, "entries": len(self.entries)}
+
+
+# ---------- Ingredient Matching ----------
+_QUANTITY = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?|[½¼¾⅓⅔])"
+_UNIT = (r"(?:cups?|tbsps?|tablespoons?|tsps?|teaspoons?|g|grams?|kg|ml|l|litres?|liters?|oz|ounces?"
+         r"|lbs?|pounds?|slices?|cloves?|pinch(?:es)?|cans?|handfuls?)")
+_INGREDIENT_RE = re.compile(rf"^\s*(?P<qty>{_QUANTITY})?\s*(?:(?P<unit>{_UNIT})\.?\s+(?:of\s+)?)?(?P<item>.*)$",
+                            re.IGNORECASE)
+
+_DESCRIPTORS = {"fresh", "ripe", "large", "small", "medium", "chopped", "minced", "diced", "sliced", "grated"}
+
+
+def _singular(word):
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def parse_ingredient(text):
+    """Split "2 cups flour" into ("2", "cups", "flour"); quantity and unit may be None."""
+    m = _INGREDIENT_RE.match(text)
+    qty, unit, item = m.group("qty"), m.group("unit"), m.group("item")
+    if qty and not unit:
+        # Glued units such as "400g spaghetti".
+        glued = re.match(rf"^(?P<unit>{_UNIT})\s+(?P<item>.+)$", item, re.IGNORECASE)
+        if glued:
+            unit, item = glued.group("unit"), glued.group("item")
+    return qty, unit, item
+
+
+@lru_cache(maxsize=65536)
+def normalize_ingredient(text):
+    """Reduce an ingredient line to its vocabulary term: "2 cups flour" -> "flour"."""
+    item = parse_ingredient(text)[2].lower()
+    item = re.sub(r"\(.*?\)", " ", item).split(",")[0]
+    words = [w for w in re.findall(r"[a-z]+(?:-[a-z]+)*", item) if w not in _DESCRIPTORS]
+    if not words:
+        return ""
+    words[-1] = _singular(words[-1])
+    return " ".join(words)
+
+
+_FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3}
+
+# Alias -> (canonical unit, factor). Weights normalise to grams and volumes
+# to millilitres so "1 cup" and "250 ml" of milk add up.
+_UNITS = {
+    "g": ("g", 1), "gram": ("g", 1), "kg": ("g", 1000), "oz": ("g", 28.35), "ounce": ("g", 28.35),
+    "lb": ("g", 453.6), "pound": ("g", 453.6),
+    "ml": ("ml", 1), "l": ("ml", 1000), "litre": ("ml", 1000), "liter": ("ml", 1000),
+    "cup": ("ml", 240), "tbsp": ("ml", 15), "tablespoon": ("ml", 15), "tsp": ("ml", 5), "teaspoon": ("ml", 5),
+    "slice": ("slice", 1), "clove": ("clove", 1), "pinch": ("pinch", 1), "can": ("can", 1),
+    "handful": ("handful", 1),
+}
+
+
+def parse_quantity(text):
+    """Turn "1 1/2", "1/2", "0.5" or "½" into a float; None for "1/0"."""
+    total = 0.0
+    for part in text.split():
+        if part in _FRACTIONS:
+            total += _FRACTIONS[part]
+        elif "/" in part:
+            numerator, denominator = map(int, part.split("/"))
+            if not denominator:
+                return None
+            total += numerator / denominator
+        else:
+            total += float(part)
+    return total
+
+
+@lru_cache(maxsize=65536)
+def structured_ingredient(text):
+    """Parse an ingredient line into (quantity, unit, item) with normalised units.
+
+    "2 cups flour" -> (480.0, "ml", "flour"); "3 eggs" -> (3.0, "", "egg");
+    "salt" -> (None, None, "salt"). The unit is "" for plain counts.
+    """
+    qty, unit, _ = parse_ingredient(text)
+    item = normalize_ingredient(text) or text.strip().lower()
+    if qty is None:
+        return None, None, item
+    quantity = parse_quantity(qty)
+    if quantity is None:
+        return None, None, item
+    if unit is None:
+        return quantity, "", item
+    unit = unit.lower()
+    canonical = _UNITS.get(unit) or _UNITS.get(_singular(unit)) or _UNITS.get(unit.rstrip("s"))
+    if canonical is None:
+        return quantity, unit, item
+    return quantity * canonical[1], canonical[0], item
+
+
+def _bitset(positions, size):
+    """Build an int with the given bit positions set, in one pass over a buffer."""
+    buf = bytearray((size + 7) // 8)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _low_bits(bits, limit):
+    """Positions of the lowest `limit` set bits of `bits`."""
+    out = []
+    while bits and len(out) < limit:
+        low = bits & -bits
+        out.append(low.bit_length() - 1)
+        bits ^= low
+    return out
+
+
+class IngredientIndex:
+    """Ingredient vocabulary plus a bitset per recipe over that vocabulary.
+
+    Recipes are stored in descending rating order. Bit i of ``masks[n]`` is
+    set when recipe n uses ``terms[i]``; ``postings`` is the transpose, one
+    bitset over recipes per term (kept as a position list for rare terms,
+    where that is smaller). A query adds the term bitsets with a bit-sliced
+    counter, so every recipe's match count is computed a machine word at a
+    time, then reads results off the lowest set bits of each coverage class.
+    """
+
+    def __init__(self, recipes):
+        self.recipes = sorted(recipes, key=lambda r: -r.rating)
+        self.vocabulary = {}
+        self.terms = []
+        self.masks = []
+        self.sizes = []
+        positions = []
+        for n, recipe in enumerate(self.recipes):
+            mask = 0
+            for ingredient in recipe.ingredients:
+                term = normalize_ingredient(ingredient)
+                if not term:
+                    continue
+                bit = self.vocabulary.get(term)
+                if bit is None:
+                    bit = self.vocabulary[term] = len(self.terms)
+                    self.terms.append(term)
+                    positions.append([])
+                if not mask >> bit & 1:
+                    mask |= 1 << bit
+                    positions[bit].append(n)
+            self.masks.append(mask)
+            self.sizes.append(mask.bit_count())
+        count = len(self.recipes)
+        self.postings = [_bitset(p, count) if len(p) * 64 >= count else p for p in positions]
+        by_size = {}
+        for n, size in enumerate(self.sizes):
+            by_size.setdefault(size, []).append(n)
+        self.size_classes = {size: _bitset(p, count) for size, p in by_size.items() if size}
+
+    def query_mask(self, ingredients):
+        mask = 0
+        for ingredient in ingredients:
+            bit = self.vocabulary.get(normalize_ingredient(ingredient))
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def terms_in(self, mask):
+        return [self.terms[bit] for bit in _low_bits(mask, mask.bit_count())]
+
+    def match(self, ingredients, limit):
+        """Top `limit` recipes by ingredient coverage, ties broken by rating."""
+        have = self.query_mask(ingredients)
+        count = len(self.recipes)
+        planes = []
+        for bit in _low_bits(have, have.bit_count()):
+            carry = self.postings[bit]
+            if isinstance(carry, list):
+                carry = _bitset(carry, count)
+            for i, plane in enumerate(planes):
+                planes[i], carry = plane ^ carry, plane & carry
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+
+        by_coverage = {}
+        for matched in range(1, 1 << len(planes)):
+            exact = -1
+            for i, plane in enumerate(planes):
+                exact &= plane if matched >> i & 1 else ~plane
+            if not exact:
+                continue
+            for size, members in self.size_classes.items():
+                hits = exact & members
+                if hits:
+                    coverage = matched / size
+                    by_coverage[coverage] = by_coverage.get(coverage, 0) | hits
+
+        best = []
+        for coverage in sorted(by_coverage, reverse=True):
+            best += _low_bits(by_coverage[coverage], limit - len(best))
+            if len(best) == limit:
+                break
+        return [{
+            "recipe": self.recipes[n].model_dump(),
+            "coverage": round((self.masks[n] & have).bit_count() / self.sizes[n], 3),
+            "missing": self.terms_in(self.masks[n] & ~have),
+        } for n in best]
+
+
+# ---------- Similar Recipes ----------
+MINHASH_BANDS = 16
+MINHASH_ROWS = 2
+SIMILAR_TOP_K = 10
+# Cap on LSH candidates scored per recipe, so huge buckets of near-identical
+# recipes cannot make the build quadratic.
+SIMILAR_MAX_CANDIDATES = 64
+_MERSENNE_61 = (1 << 61) - 1
+_rng = random.Random(20240101)
+_MINHASH_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_61), _rng.randrange(_MERSENNE_61))
+                         for _ in range(MINHASH_BANDS * MINHASH_ROWS)]
+del _rng
+
+
+def recipe_features(recipe):
+    """Token set compared by Jaccard similarity: tags, ingredients, type, difficulty."""
+    features = {f"type:{recipe.type.lower()}", f"difficulty:{recipe.difficulty.lower()}"}
+    features.update(f"tag:{tag.lower()}" for tag in recipe.tags)
+    features.update(f"ing:{term}" for term in map(normalize_ingredient, recipe.ingredients) if term)
+    return frozenset(features)
+
+
+@lru_cache(maxsize=65536)
+def _feature_hashes(feature):
+    x = zlib.crc32(feature.encode("utf-8"))
+    return tuple((a * x + b) % _MERSENNE_61 for a, b in _MINHASH_PERMUTATIONS)
+
+
+def minhash(features):
+    return tuple(map(min, zip(*map(_feature_hashes, features))))
+
+
+class SimilarityIndex:
+    """Precomputed top-k similar recipes, found with MinHash/LSH.
+
+    Signatures are split into bands; recipes sharing any band land in the
+    same bucket and only those candidates get an exact Jaccard score (a
+    catalogue that fits in the candidate budget is simply scored in full).
+    ``neighbours`` maps a recipe id to its ``(score, id)`` list, best first,
+    and ``referrers`` is its transpose: the ids whose lists mention a recipe.
+    An index is never modified once built; ``with_changes`` derives the next.
+    """
+
+    def __init__(self, recipes, k=SIMILAR_TOP_K):
+        self.k = k
+        self.features = {}
+        self.bands = {}
+        self.buckets = [{} for _ in range(MINHASH_BANDS)]
+        self.neighbours = {}
+        for recipe in recipes:
+            self._insert(recipe)
+        referrers = {}
+        for recipe in recipes:
+            top = self.neighbours[recipe.id] = heapq.nlargest(k, self._scored(recipe.id))
+            for _, other in top:
+                referrers.setdefault(other, []).append(recipe.id)
+        self.referrers = {recipe_id: frozenset(ids) for recipe_id, ids in referrers.items()}
+
+    def _signature(self, recipe):
+        """Record a recipe's features and band keys; returns the keys."""
+        features = self.features[recipe.id] = recipe_features(recipe)
+        signature = minhash(features) if features else ()
+        keys = self.bands[recipe.id] = [signature[i * MINHASH_ROWS:(i + 1) * MINHASH_ROWS]
+                                        for i in range(MINHASH_BANDS)] if signature else []
+        return keys
+
+    def _insert(self, recipe):
+        for bucket, key in zip(self.buckets, self._signature(recipe)):
+            bucket.setdefault(key, []).append(recipe.id)
+
+    def _scored(self, recipe_id):
+        features = self.features[recipe_id]
+        if len(self.features) <= SIMILAR_MAX_CANDIDATES:
+            # Small catalogue: scoring everything is cheaper than missing a neighbour.
+            candidates = set(self.features)
+        else:
+            candidates = set()
+            for bucket, key in zip(self.buckets, self.bands[recipe_id]):
+                candidates.update(bucket[key][:SIMILAR_MAX_CANDIDATES])
+                if len(candidates) > SIMILAR_MAX_CANDIDATES:
+                    break
+        candidates.discard(recipe_id)
+        size = len(features)
+        all_features = self.features
+        scored = []
+        for other in candidates:
+            other_features = all_features[other]
+            shared = len(features & other_features)
+            if shared:
+                scored.append((shared / (size + len(other_features) - shared), other))
+        return scored
+
+    def _set_neighbours(self, recipe_id, top):
+        """Replace a top-k list, keeping ``referrers`` in step (copy-on-write)."""
+        old = {other for _, other in self.neighbours.get(recipe_id, ())}
+        new = {other for _, other in top}
+        for other in old - new:
+            self.referrers[other] = self.referrers[other] - {recipe_id}
+        for other in new - old:
+            self.referrers[other] = self.referrers.get(other, frozenset()) | {recipe_id}
+        self.neighbours[recipe_id] = top
+
+    def with_changes(self, upserts=(), deletes=()):
+        """New index with `upserts` re-indexed and `deletes` dropped.
+
+        Containers are copied and touched lists and sets replaced, so this
+        index stays valid for snapshots still holding it. The lists that
+        mentioned a changed recipe are found through ``referrers`` and
+        rescored, which also refills lists that lost a neighbour.
+        """
+        index = SimilarityIndex.__new__(SimilarityIndex)
+        index.k = self.k
+        index.features = dict(self.features)
+        index.bands = dict(self.bands)
+        index.buckets = [dict(bucket) for bucket in self.buckets]
+        index.neighbours = dict(self.neighbours)
+        index.referrers = dict(self.referrers)
+        upserted = {r.id for r in upserts}
+        changed = set(deletes) | upserted
+        stale = set().union(*(index.referrers.get(recipe_id, ()) for recipe_id in changed))
+        # Bucket edits are gathered first so each touched list is rebuilt once.
+        touched = {}
+        for recipe_id in changed:
+            if index.features.pop(recipe_id, None) is None:
+                continue
+            for band, key in enumerate(index.bands.pop(recipe_id)):
+                touched.setdefault((band, key), [])
+            index._set_neighbours(recipe_id, [])
+            del index.neighbours[recipe_id]
+        for recipe in upserts:
+            for band, key in enumerate(index._signature(recipe)):
+                touched.setdefault((band, key), []).append(recipe.id)
+        for (band, key), added in touched.items():
+            bucket = index.buckets[band]
+            bucket[key] = [other for other in bucket.get(key, ()) if other not in changed] + added
+        stale = (stale & index.features.keys()) | upserted
+        for recipe_id in stale:
+            index._set_neighbours(recipe_id, heapq.nlargest(index.k, index._scored(recipe_id)))
+        # Upserts may also belong in lists that never mentioned them.
+        for recipe in upserts:
+            for score, other in index.neighbours[recipe.id]:
+                top = index.neighbours[other]
+                if (score, recipe.id) not in top and (len(top) < index.k or (score, recipe.id) > top[-1]):
+                    index._set_neighbours(other, sorted(
+                        [entry for entry in top if entry[1] != recipe.id] + [(score, recipe.id)],
+                        reverse=True)[:index.k])
+        for recipe_id in changed - upserted:
+            index.referrers.pop(recipe_id, None)
+        return index
+
+    def similar(self, recipe_id, limit):
+        return [(round(score, 3), other) for score, other in self.neighbours[recipe_id][:limit]]
+
+
+# ---------- Columnar Recipe Store ----------
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(d(?:ays?)?|h(?:ours?|rs?)?|m(?:in(?:ute)?s?)?)\b")
+_DURATION_MINUTES = {"d": 1440, "h": 60, "m": 1}
+
+
+def parse_minutes(text):
+    """Parse free-text durations such as "20 min", "1 hour" or "1 hr 30 min"."""
+    total = None
+    for amount, unit in _DURATION_RE.findall(text.lower()):
+        total = (total or 0) + float(amount) * _DURATION_MINUTES[unit[0]]
+    return total
+
+
+def _nan_if_none(value):
+    return math.nan if value is None else value
+
+
+class BinnedColumn:
+    """A float column plus a one-byte bin code per row.
+
+    Rows are binned by value quantile (code 255 holds NaN). A monotone
+    predicate such as ``<= x`` is decided per bin from the bin's min and max,
+    turned into a 0/1 byte per row with ``bytes.translate``, and only rows in
+    the one or two bins straddling the bound are checked individually.
+    """
+
+    NAN_CODE = 255
+
+    def __init__(self, values):
+        self.values = array("d", values)
+        present = sorted(v for v in self.values if not math.isnan(v))
+        cuts = sorted({present[len(present) * j // self.NAN_CODE] for j in range(1, self.NAN_CODE)}) \
+            if present else []
+        self.codes = bytes(self.NAN_CODE if math.isnan(v) else bisect_right(cuts, v) for v in self.values)
+        self.members = [array("l") for _ in range(256)]
+        for row, code in enumerate(self.codes):
+            self.members[code].append(row)
+        self.bounds = [(min(self.values[r] for r in rows), max(self.values[r] for r in rows))
+                       if rows and code != self.NAN_CODE else None
+                       for code, rows in enumerate(self.members)]
+
+    def mask(self, predicate):
+        table = bytearray(256)
+        partial = []
+        for code, bounds in enumerate(self.bounds):
+            if bounds is None:
+                continue
+            low, high = map(predicate, bounds)
+            if low and high:
+                table[code] = 1
+            elif low or high:
+                partial.append(code)
+        mask = bytearray(self.codes.translate(table))
+        values = self.values
+        for code in partial:
+            for row in self.members[code]:
+                mask[row] = predicate(values[row])
+        return mask
+
+
+def _and_masks(masks, size):
+    combined = int.from_bytes(masks[0], "little")
+    for mask in masks[1:]:
+        combined &= int.from_bytes(mask, "little")
+    return combined.to_bytes(size, "little")
+
+
+class RecipeColumns:
+    """Recipe fields as parallel columns, indexed by catalogue row.
+
+    Minutes, rating and calories are BinnedColumns (missing values are NaN
+    and never match); type and difficulty are one-byte codes. Each filter
+    becomes a 0/1 byte mask built in C, masks are ANDed as big integers, and
+    sort orders are argsorted once per snapshot and cached.
+    """
+
+    SORT_KEYS = ("rating", "time", "calories")
+
+    def __init__(self, recipes):
+        self.size = len(recipes)
+        self.minutes = BinnedColumn(_nan_if_none(parse_minutes(r.time)) for r in recipes)
+        self.rating = BinnedColumn(r.rating for r in recipes)
+        self.calories = BinnedColumn(_nan_if_none(r.calories) for r in recipes)
+        self.type_codes = {}
+        self.difficulty_codes = {}
+        self.type = bytes(self.type_codes.setdefault(r.type.lower(), len(self.type_codes))
+                          for r in recipes)
+        self.difficulty = bytes(self.difficulty_codes.setdefault(r.difficulty.lower(), len(self.difficulty_codes))
+                                for r in recipes)
+        self._orders = {}
+
+    def order(self, sort):
+        """Row positions sorted by `sort` ("rating", "-rating", "time", ...); NaN last."""
+        order = self._orders.get(sort)
+        if order is None:
+            column = {"rating": self.rating, "time": self.minutes, "calories": self.calories}[sort.lstrip("-")]
+            values = column.values
+            descending = sort.startswith("-")
+            order = sorted(range(self.size),
+                           key=lambda i: (math.isnan(values[i]), -values[i] if descending else values[i]))
+            order = self._orders[sort] = array("l", order)
+        return order
+
+    def select(self, max_time=None, min_rating=None, max_calories=None, type=None, difficulty=None,
+               sort=None):
+        """Row positions matching every given predicate, in `sort` order."""
+        masks = []
+        if max_time is not None:
+            masks.append(self.minutes.mask(float(max_time).__ge__))
+        if min_rating is not None:
+            masks.append(self.rating.mask(float(min_rating).__le__))
+        if max_calories is not None:
+            masks.append(self.calories.mask(float(max_calories).__ge__))
+        for value, codes, column in ((type, self.type_codes, self.type),
+                                     (difficulty, self.difficulty_codes, self.difficulty)):
+            if value is not None:
+                code = codes.get(value.lower())
+                if code is None:
+                    return []
+                table = bytearray(256)
+                table[code] = 1
+                masks.append(column.translate(table))
+        rows = range(self.size) if sort is None else self.order(sort)
+        if not masks:
+            return rows
+        mask = _and_masks(masks, self.size)
+        if sort is None:
+            return list(compress(rows, mask))
+        return list(compress(rows, map(mask.__getitem__, rows)))
+
+
+# ---------- Meal Planner ----------
+MEAL_TYPES = ("breakfast", "lunch", "dinner")
+MEALPLAN_MAX_DAYS = 14
+
+
+def _pareto(options):
+    """Keep (calories, score, ...) entries no other entry beats on both counts."""
+    frontier = []
+    best = -1
+    for option in sorted(options, key=lambda o: (o[0], -o[1])):
+        if option[1] > best:
+            frontier.append(option)
+            best = option[1]
+    return frontier
+
+
+class MealPlanner:
+    """Calorie-budgeted daily menus that maximise total rating.
+
+    Each day is a multiple-choice knapsack: one recipe per meal type, total
+    calories within budget. Only Pareto-optimal (calories, rating) recipes
+    can be in an optimal menu, so the DP merges small frontiers type by
+    type instead of enumerating combinations. Each type keeps the first
+    MEALPLAN_MAX_DAYS frontier layers, enough to replace recipes already
+    used on earlier days without rescanning the catalogue.
+    """
+
+    def __init__(self, catalogue, max_plans=256):
+        columns = catalogue.columns
+        self.recipes = catalogue.recipes
+        self.calories = columns.calories.values
+        self.scores = [round(r * 100) for r in columns.rating.values]
+        self.pools = {}
+        for name, code in columns.type_codes.items():
+            table = bytearray(256)
+            table[code] = 1
+            rows = [row for row in compress(range(len(self.recipes)), columns.type.translate(table))
+                    if not math.isnan(self.calories[row])]
+            self.pools[name] = self._layers(rows, MEALPLAN_MAX_DAYS)
+        self.max_plans = max_plans
+        self._plans = OrderedDict()
+
+    def _layers(self, rows, count):
+        remaining = sorted(rows, key=lambda row: (self.calories[row], -self.scores[row]))
+        pool = []
+        for _ in range(count):
+            best, rest = -1, []
+            for row in remaining:
+                if self.scores[row] > best:
+                    pool.append(row)
+                    best = self.scores[row]
+                else:
+                    rest.append(row)
+            remaining = rest
+        return pool
+
+    def plan(self, budget, days, dessert=False):
+        """Rows chosen per day as lists ordered like the meal types; memoised."""
+        key = (budget, days, dessert)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = self._solve(budget, days, dessert)
+            if len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        return plan
+
+    def _solve(self, budget, days, dessert):
+        types = MEAL_TYPES + (("dessert",) if dessert else ())
+        missing = [name for name in types if not self.pools.get(name)]
+        if missing:
+            raise ValueError(f"No recipes with calories for: {', '.join(missing)}")
+        used = set()
+        plan = []
+        for day in range(days):
+            states = [(0.0, 0, ())]
+            for name in types:
+                options = _pareto((self.calories[row], self.scores[row], row)
+                                  for row in self.pools[name] if row not in used)
+                states = _pareto((calories + option[0], score + option[1], rows + (option[2],))
+                                 for calories, score, rows in states
+                                 for option in options if calories + option[0] <= budget)
+            if not states:
+                raise ValueError(f"Cannot plan day {day + 1} within {budget} calories without repeating recipes")
+            rows = states[-1][2]
+            used.update(rows)
+            plan.append(rows)
+        return plan
+
+
+# ---------- Search Suggestions ----------
+SUGGEST_TOP_K = 10
+
+
+class SuggestIndex:
+    """Prefix suggestions over recipe names, tags and normalised ingredients.
+
+    Keys sit in one sorted list, so a prefix is a ``bisect`` range. Every
+    prefix whose range holds more than ``k`` keys has its top-k suggestions
+    by rating precomputed; smaller ranges are ranked on the fly, which costs
+    at most ``k`` entries. Recipe names are keyed from each word onwards, so
+    "pan" finds "Classic Pancakes".
+    """
+
+    def __init__(self, recipes, k=SUGGEST_TOP_K):
+        self.k = k
+        self.suggestions = []
+        self.scores = []
+        ids = {}
+        keyed = []
+
+        def suggestion(kind, text, rating, recipe_id=None):
+            sid = ids.get((kind, text))
+            if sid is None:
+                sid = ids[kind, text] = len(self.suggestions)
+                entry = {"text": text, "kind": kind}
+                if recipe_id is not None:
+                    entry["id"] = recipe_id
+                self.suggestions.append(entry)
+                self.scores.append(rating)
+            else:
+                self.scores[sid] = max(self.scores[sid], rating)
+            return sid
+
+        for recipe in recipes:
+            sid = suggestion("recipe", recipe.name, recipe.rating, recipe.id)
+            words = _normalize_query(recipe.name).split(" ")
+            keyed.extend((" ".join(words[i:]), sid) for i in range(len(words)))
+            for tag in recipe.tags:
+                keyed.append((_normalize_query(tag), suggestion("tag", tag.lower(), recipe.rating)))
+            for term in map(normalize_ingredient, recipe.ingredients):
+                if term:
+                    keyed.append((term, suggestion("ingredient", term, recipe.rating)))
+        keyed.sort()
+        self.keys = [key for key, _ in keyed]
+        self.sids = [sid for _, sid in keyed]
+        self.top = {}
+        stack = [("", 0, len(self.keys))]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            if hi - lo <= k:
+                continue
+            self.top[prefix] = self._rank(lo, hi)
+            # Split the range by the next character to find heavy children.
+            depth = len(prefix)
+            start = lo
+            while start < hi:
+                if len(self.keys[start]) <= depth:
+                    start += 1
+                    continue
+                child = self.keys[start][:depth + 1]
+                end = bisect_left(self.keys, child + "\U0010ffff", start, hi)
+                stack.append((child, start, end))
+                start = end
+
+    def _rank(self, lo, hi):
+        return heapq.nlargest(self.k, set(self.sids[lo:hi]), key=lambda sid: (self.scores[sid], -sid))
+
+    def suggest(self, prefix, limit):
+        prefix = _normalize_query(prefix)
+        top = self.top.get(prefix)
+        if top is None:
+            lo = bisect_left(self.keys, prefix)
+            top = self._rank(lo, bisect_left(self.keys, prefix + "\U0010ffff", lo))
+        return [self.suggestions[sid] for sid in top[:limit]]
+
+
+def _normalize_query(text):
+    return " ".join(text.lower().split())
+
 
 # ---------- Frontend HTML with Enhanced Features ----------
 HTML_PAGE = """
@@ -647,7 +1555,8 @@ HTML_PAGE = """
 
   <div class="controls">
     <div class="search-filter">
-      <input type="text" id="search" placeholder="Search recipes...">
+      <input type="text" id="search" placeholder="Search recipes..." list="search-suggestions" autocomplete="off">
+      <datalist id="search-suggestions"></datalist>
       <div class="filter-buttons">
         <button class="filter-btn active" data-filter="all">All</button>
         <button class="filter-btn" data-filter="Breakfast">Breakfast</button>
@@ -660,20 +1569,20 @@ HTML_PAGE = """
 
   <div class="stats">
     <div class="stat-item">
-      <div class="stat-number" id="total-recipes">0</div>
+      <div class="stat-number" id="total-recipes"><!--TOTAL_RECIPES--></div>
       <div>Total Recipes</div>
     </div>
     <div class="stat-item">
-      <div class="stat-number" id="avg-rating">0.0</div>
+      <div class="stat-number" id="avg-rating"><!--AVG_RATING--></div>
       <div>Average Rating</div>
     </div>
     <div class="stat-item">
-      <div class="stat-number" id="total-feedback">0</div>
+      <div class="stat-number" id="total-feedback"><!--TOTAL_FEEDBACK--></div>
       <div>Feedback Received</div>
     </div>
   </div>
 
-  <div id="recipe-container">Loading recipes...</div>
+  <div id="recipe-container"><!--RECIPE_CARDS--></div>
 
   <!-- Feedback Button and Success Message -->
   <div class="success-message" id="successMessage">
@@ -733,22 +1642,71 @@ HTML_PAGE = """
     </button>
   </footer>
 
+  <script id="initial-data" type="application/json"><!--INITIAL_DATA--></script>
   <script>
     let recipes = [];
     let selectedRating = 0;
 
-    // Load recipes and initialize the page
+    // The first page of cards and the stats are rendered server-side;
+    // fetch the rest of the catalogue only if it was not all inlined.
     document.addEventListener("DOMContentLoaded", async () => {
-      await loadRecipes();
-      await loadFeedbackStats();
+      const initial = JSON.parse(document.getElementById("initial-data").textContent);
+      recipes = initial.recipes;
+      populateRecipeSelect();
       setupEventListeners();
+      if (!initial.complete) {
+        await loadRecipes(initial);
+      }
     });
 
-    async function loadRecipes() {
+    // The full catalogue is kept in IndexedDB; on later visits only the
+    // changes since the cached version are downloaded.
+    function openCatalogueDB() {
+      return new Promise((resolve, reject) => {
+        const request = indexedDB.open("flavorfinds", 1);
+        request.onupgradeneeded = () => request.result.createObjectStore("catalogue");
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+      });
+    }
+
+    async function cachedCatalogue(entry) {
+      if (!window.indexedDB) return null;
       try {
-        const response = await fetch("/api/recipes");
-        recipes = await response.json();
-        displayRecipes(recipes);
+        const db = await openCatalogueDB();
+        return await new Promise((resolve, reject) => {
+          const store = db.transaction("catalogue", entry ? "readwrite" : "readonly").objectStore("catalogue");
+          const request = entry ? store.put(entry, "recipes") : store.get("recipes");
+          request.onsuccess = () => resolve(entry || request.result || null);
+          request.onerror = () => reject(request.error);
+        });
+      } catch (error) {
+        console.warn("Recipe cache unavailable:", error);
+        return null;
+      }
+    }
+
+    function applyChanges(cached, changes) {
+      if (changes.full) return changes.recipes;
+      const byId = new Map(cached.recipes.map(recipe => [recipe.id, recipe]));
+      changes.deleted.forEach(id => byId.delete(id));
+      changes.updated.concat(changes.added).forEach(recipe => byId.set(recipe.id, recipe));
+      return [...byId.values()];
+    }
+
+    async function loadRecipes(initial) {
+      try {
+        const cached = await cachedCatalogue();
+        if (cached && cached.epoch === initial.epoch && cached.version === initial.version) {
+          recipes = cached.recipes;
+        } else {
+          const query = cached ? `?since=${cached.version}&epoch=${encodeURIComponent(cached.epoch)}` : "";
+          const response = await fetch(`/api/recipes/changes${query}`);
+          const changes = await response.json();
+          recipes = applyChanges(cached, changes);
+          await cachedCatalogue({epoch: changes.epoch, version: changes.version, recipes});
+        }
+        filterRecipes();
         populateRecipeSelect();
         updateStats();
       } catch (error) {
@@ -802,6 +1760,7 @@ HTML_PAGE = """
       // Search functionality
       document.getElementById("search").addEventListener("input", (e) => {
         filterRecipes();
+        scheduleSuggestions(e.target.value);
       });
 
       // Filter buttons
@@ -832,6 +1791,43 @@ HTML_PAGE = """
       });
     }
 
+    // Typeahead: debounce keystrokes and abort any request still in flight.
+    let suggestTimer = null;
+    let suggestController = null;
+
+    function scheduleSuggestions(prefix) {
+      clearTimeout(suggestTimer);
+      suggestTimer = setTimeout(() => loadSuggestions(prefix.trim()), 150);
+    }
+
+    async function loadSuggestions(prefix) {
+      if (suggestController) {
+        suggestController.abort();
+      }
+      const list = document.getElementById("search-suggestions");
+      if (!prefix) {
+        list.innerHTML = "";
+        return;
+      }
+      suggestController = new AbortController();
+      try {
+        const response = await fetch(`/api/recipes/suggest?prefix=${encodeURIComponent(prefix)}`,
+                                     { signal: suggestController.signal });
+        const suggestions = await response.json();
+        list.innerHTML = "";
+        suggestions.forEach(s => {
+          const option = document.createElement("option");
+          option.value = s.text;
+          option.label = s.kind;
+          list.appendChild(option);
+        });
+      } catch (error) {
+        if (error.name !== "AbortError") {
+          console.error("Error loading suggestions:", error);
+        }
+      }
+    }
+
     function filterRecipes() {
       const searchTerm = document.getElementById("search").value.toLowerCase();
       const activeFilter = document.querySelector(".filter-btn.active").getAttribute("data-filter");
@@ -940,76 +1936,827 @@ HTML_PAGE = """
 </html>
 """
 
-# ---------- Feedback Storage ----------
-FEEDBACK_FILE = "data/feedback.json"
+# ---------- Server-side Rendering ----------
+FIRST_PAGE_SIZE = 24
 
 
-def load_feedback():
+def render_recipe_card(recipe):
+    """Server-side twin of displayRecipes() in HTML_PAGE."""
+    e = html.escape
+    tags = "".join(f'<span class="tag">#{e(tag)}</span>' for tag in recipe.tags)
+    calories = recipe.calories if recipe.calories else "N/A"
+    return f"""
+        <div class="recipe-card" onclick="showRecipeDetail({recipe.id})">
+          <img src="{e(recipe.img)}" alt="{e(recipe.name)}" class="recipe-image">
+          <div class="recipe-content">
+            <div class="recipe-header">
+              <h3 class="recipe-title">{e(recipe.name)}</h3>
+              <span class="badge">{e(recipe.difficulty)}</span>
+            </div>
+            <p>{e(recipe.desc)}</p>
+            <div class="recipe-meta">
+              <span><i class="fas fa-clock"></i> {e(recipe.time)}</span>
+              <span class="rating">⭐ {recipe.rating}</span>
+              <span><i class="fas fa-fire"></i> {calories} cal</span>
+            </div>
+            <div class="tags">
+              {tags}
+            </div>
+            <button onclick="event.stopPropagation(); openFeedbackModal({recipe.id})" 
+                    style="background: var(--primary); color: white; border: none; padding: 5px 10px; border-radius: 5px; cursor: pointer; margin-top: 10px; width: 100%;">
+              <i class="fas fa-star"></i> Rate this Recipe
+            </button>
+          </div>
+        </div>
+      """
+
+
+def render_page_parts(catalogue):
+    """Render HTML_PAGE for a catalogue, split around the feedback counter."""
+    recipes = catalogue.recipes
+    first_page = recipes[:FIRST_PAGE_SIZE]
+    complete = len(first_page) == len(recipes)
+    if not recipes:
+        cards = "<p style='text-align: center;'>No recipes found matching your criteria.</p>"
+    else:
+        cards = "".join(render_recipe_card(r) for r in first_page)
+    average = sum(map(attrgetter("rating"), recipes)) / len(recipes) if recipes else 0
+    initial_json = catalogue.recipes_json if complete else json_dumps([r.model_dump() for r in first_page])
+    initial_data = b'{"epoch":"%s","version":%d,"complete":%s,"recipes":%s}' % (
+        catalogue.epoch.encode(), catalogue.version, b"true" if complete else b"false", initial_json)
+    # Escape "<" so the payload can never close the <script> element early.
+    initial_data = initial_data.decode("utf-8").replace("<", "\\u003c")
+    page = (HTML_PAGE
+            .replace("<!--TOTAL_RECIPES-->", str(len(recipes)))
+            .replace("<!--AVG_RATING-->", f"{average:.1f}")
+            .replace("<!--RECIPE_CARDS-->", cards)
+            .replace("<!--INITIAL_DATA-->", initial_data))
+    before, after = page.split("<!--TOTAL_FEEDBACK-->")
+    return before, after
+
+
+# ---------- Feedback Storage ----------
+def load_feedback_raw(path):
     try:
-        if os.path.exists(FEEDBACK_FILE):
-            with open(FEEDBACK_FILE, 'r') as f:
-                data = json.load(f)
-                return [Feedback(**item) for item in data]
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
     except Exception as e:
         print(f"Error loading feedback: {e}")
     return []
 
 
-def save_feedback(feedback_list):
+def load_feedback(path):
+    return [Feedback(**item) for item in load_feedback_raw(path)]
+
+
+_feedback_stats_cache = {}
+
+
+def _summarize_feedback(ratings):
+    total_feedback = len(ratings)
+    average_rating = sum(ratings) / total_feedback if total_feedback > 0 else 0
+    return {
+        "total_feedback": total_feedback,
+        "average_rating": round(average_rating, 1)
+    }
+
+
+def cached_feedback_stats(path):
+    """Memoised feedback totals if the file is unchanged since, else None."""
+    cached = _feedback_stats_cache.get(path)
+    if cached is not None and cached[0] == _file_signature(path):
+        return cached[1]
+    return None
+
+
+def remember_feedback_stats(path, feedback_list):
+    """Record totals for the feedback just written, so readers need not re-parse it."""
+    _feedback_stats_cache[path] = (_file_signature(path),
+                                   _summarize_feedback([f.rating for f in feedback_list]))
+
+
+def feedback_stats(path):
+    """Feedback totals, recomputed only when the file's mtime or size changes.
+
+    A recompute parses the whole history; async callers go through
+    current_feedback_stats so that never happens on the event loop.
+    """
+    stats = cached_feedback_stats(path)
+    if stats is None:
+        key = _file_signature(path)
+        stats = _summarize_feedback([f["rating"] for f in load_feedback_raw(path)])
+        _feedback_stats_cache[path] = (key, stats)
+    return stats
+
+
+async def current_feedback_stats(path):
+    stats = cached_feedback_stats(path)
+    if stats is None:
+        stats = await asyncio.get_running_loop().run_in_executor(None, feedback_stats, path)
+    return stats
+
+
+def iter_feedback(path, chunk_size=1 << 16):
+    """Stream feedback entries from the JSON array file, `chunk_size` chars at a time."""
+    if not os.path.exists(path):
+        return
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buf, pos = f.read(chunk_size).lstrip(), 1
+        if not buf.startswith("["):
+            raise ValueError("Feedback file is not a JSON array")
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield item
+            pos = end
+
+
+FEEDBACK_FIELDS = list(Feedback.model_fields)
+
+
+def _feedback_since(entries, since):
+    for entry in entries:
+        try:
+            if since is None or datetime.fromisoformat(entry["timestamp"]) >= since:
+                yield entry
+        except (KeyError, TypeError, ValueError):
+            continue
+
+
+def _batched(entries, size):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_feedback_csv(path, since=None, batch_size=1000):
+    """Yield the feedback log as CSV bytes, one batch of rows at a time."""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=FEEDBACK_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for batch in _batched(_feedback_since(iter_feedback(path), since), batch_size):
+        writer.writerows(batch)
+        yield out.getvalue().encode("utf-8")
+        out.seek(0)
+        out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands buffered bytes back to a generator."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def export_feedback_parquet(path, since=None, batch_size=10000):
+    """Yield the feedback log as Parquet bytes, one row group per batch."""
+    schema = pyarrow.schema([
+        ("name", pyarrow.string()), ("email", pyarrow.string()), ("rating", pyarrow.int64()),
+        ("message", pyarrow.string()), ("recipe_id", pyarrow.int64()), ("timestamp", pyarrow.string()),
+    ])
+    sink = _ChunkSink()
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for batch in _batched(_feedback_since(iter_feedback(path), since), batch_size):
+            writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+class ExportResponse(StreamingResponse):
+    """StreamingResponse that gives back its export slot however it ends.
+
+    The slot is released when the response finishes, fails or is cancelled,
+    and by a finalizer if the response is dropped without ever being sent.
+    """
+
+    def __init__(self, content, slot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release_slot = weakref.finalize(self, slot.release)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release_slot()
+
+
+def save_feedback(path, feedback_list):
+    # Readers run while this writes in a worker thread: never expose a torn file.
+    tmp_path = f"{path}.tmp"
     try:
-        with open(FEEDBACK_FILE, 'w') as f:
+        with open(tmp_path, 'w') as f:
             json.dump([f.dict() for f in feedback_list], f, indent=2)
+        os.replace(tmp_path, path)
+        return True
     except Exception as e:
         print(f"Error saving feedback: {e}")
+        return False
 
 
-# ---------- Routes ----------
-@app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
-    return HTML_PAGE
-
+# ---------- Data Versioning ----------
+def bump_feedback_version(app):
+    """Mark feedback as changed, invalidating cached feedback responses."""
+    app.state.feedback_version += 1
 
-@app.get("/api/recipes", response_model=List[Recipe])
-async def get_recipes():
-    return recipes_db
 
+def cached_json(request, ttl, key, build, catalogue=None):
+    """Serve `build()` through the response cache.
 
-@app.get("/api/recipes/{recipe_id}", response_model=Recipe)
-async def get_recipe(recipe_id: int):
-    for r in recipes_db:
-        if r.id == recipe_id:
-            return r
-    raise HTTPException(status_code=404, detail="Recipe not found")
+    `key` is built by the route from its validated, normalised arguments, so
+    unknown query parameters and equivalent spellings share an entry. Bodies
+    built from a catalogue are versioned by that snapshot, everything else
+    by the feedback version, so each kind of write only flushes its own.
+    """
+    key = (request.scope["route"].path, key)
+    cache = request.app.state.response_cache
+    if catalogue is None:
+        version = request.app.state.feedback_version
+    else:
+        version = (catalogue.epoch, catalogue.version)
+    body = cache.get(key, version)
+    if body is None:
+        body = build()
+        if not isinstance(body, bytes):
+            body = json_dumps(body)
+        cache.put(key, version, body, ttl)
+    return FastJSONResponse(body)
+
+
+# ---------- Feedback Rate Limiting ----------
+class TokenBucketLimiter:
+    """Token bucket per key, refilled at `rate` tokens/s up to `burst`.
+
+    Buckets live in an OrderedDict kept in least-recently-used order; past
+    `max_keys` the idlest bucket is evicted, which at worst hands that client
+    a fresh full bucket.
+    """
+
+    def __init__(self, rate, burst, max_keys, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self.buckets = OrderedDict()
+        self.evictions = 0
+
+    def take(self, key):
+        """Spend a token for `key`; returns 0 if allowed, else seconds to wait."""
+        now = self.clock()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [float(self.burst), now]
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0
+        return (1 - bucket[0]) / self.rate
+
+
+class DuplicateFilter:
+    """Remembers content digests for `window` seconds, oldest first."""
+
+    def __init__(self, window, max_keys, clock=time.monotonic):
+        self.window = window
+        self.max_keys = max_keys
+        self.clock = clock
+        self.seen = OrderedDict()
+
+    def check(self, digest):
+        """Record `digest`; returns True if it was already seen within the window."""
+        now = self.clock()
+        while self.seen and (next(iter(self.seen.values())) <= now or len(self.seen) > self.max_keys):
+            self.seen.popitem(last=False)
+        if digest in self.seen:
+            return True
+        self.seen[digest] = now + self.window
+        return False
+
+
+class FeedbackGuard:
+    """Rejects feedback floods and exact resubmissions before any storage I/O."""
+
+    def __init__(self, config):
+        rate = config.feedback_per_minute / 60
+        self.by_ip = TokenBucketLimiter(rate, config.feedback_burst, config.limiter_max_keys)
+        self.by_email = TokenBucketLimiter(rate, config.feedback_burst, config.limiter_max_keys)
+        self.duplicates = DuplicateFilter(config.feedback_duplicate_window, config.limiter_max_keys)
+        self.counters = {"accepted": 0, "limited_ip": 0, "limited_email": 0, "duplicates": 0}
+
+    def check(self, client_ip, feedback):
+        """Raise a 429 HTTPException if this submission should be dropped."""
+        for limiter, key, counter in ((self.by_ip, client_ip, "limited_ip"),
+                                      (self.by_email, feedback.email.strip().lower(), "limited_email")):
+            wait = limiter.take(key)
+            if wait:
+                self.counters[counter] += 1
+                raise HTTPException(status_code=429, detail="Too many feedback submissions",
+                                    headers={"Retry-After": str(math.ceil(wait))})
+        content = json.dumps([feedback.email.strip().lower(), feedback.name, feedback.rating,
+                              feedback.message, feedback.recipe_id])
+        if self.duplicates.check(hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()):
+            self.counters["duplicates"] += 1
+            raise HTTPException(status_code=429, detail="Duplicate feedback submission",
+                                headers={"Retry-After": str(math.ceil(self.duplicates.window))})
+        self.counters["accepted"] += 1
+
+    def stats(self):
+        return {**self.counters,
+                "tracked_clients": len(self.by_ip.buckets) + len(self.by_email.buckets),
+                "evictions": self.by_ip.evictions + self.by_email.evictions}
+
+
+# ---------- Admission Control ----------
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class RouteGate:
+    """Concurrency limit with a bounded FIFO wait queue for one route.
+
+    A request that finds every slot busy queues only if the queue has room
+    and the expected wait (queue length x smoothed service time / slots)
+    fits the latency budget; otherwise it is rejected at once.
+    """
+
+    def __init__(self, limit, max_queue, budget):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.budget = budget
+        self.active = 0
+        self.waiters = deque()
+        self.service_time = 0.01
+        self.counters = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+
+    def expected_wait(self):
+        return (len(self.waiters) + 1) * self.service_time / self.limit
+
+    async def acquire(self):
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            self.counters["admitted"] += 1
+            return
+        wait = self.expected_wait()
+        if len(self.waiters) >= self.max_queue or wait > self.budget:
+            self.counters["rejected"] += 1
+            raise Overloaded(wait)
+        self.counters["queued"] += 1
+        slot = asyncio.get_running_loop().create_future()
+        self.waiters.append(slot)
+        try:
+            await asyncio.wait({slot}, timeout=self.budget)
+        except asyncio.CancelledError:
+            if slot.done():
+                self.release(0)  # cancelled after being handed a slot: pass it on
+            else:
+                slot.cancel()
+                self.waiters.remove(slot)
+            raise
+        if not slot.done():
+            slot.cancel()
+            self.waiters.remove(slot)
+            self.counters["timed_out"] += 1
+            raise Overloaded(self.expected_wait())
+        self.counters["admitted"] += 1
+
+    def release(self, elapsed):
+        if elapsed:
+            self.service_time += (elapsed - self.service_time) * 0.2
+        while self.waiters:
+            slot = self.waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)  # hand our slot straight to the next waiter
+                return
+        self.active -= 1
+
+    def stats(self):
+        return {**self.counters, "active": self.active, "waiting": len(self.waiters),
+                "service_time_ms": round(self.service_time * 1000, 2)}
+
+
+class AdmissionController:
+    """Per-route gates with separate budgets for reads (GET/HEAD) and writes."""
+
+    def __init__(self, config):
+        self.config = config
+        self.gates = {}
+
+    def gate(self, method, path):
+        key = (method, path)
+        gate = self.gates.get(key)
+        if gate is None:
+            config = self.config
+            if method in ("GET", "HEAD"):
+                limit, queue, budget = config.read_concurrency, config.read_queue, config.read_latency_budget
+            else:
+                limit, queue, budget = config.write_concurrency, config.write_queue, config.write_latency_budget
+            gate = self.gates[key] = RouteGate(config.route_concurrency.get(path, limit), queue, budget)
+        return gate
+
+    def stats(self):
+        return {f"{method} {path}": gate.stats() for (method, path), gate in self.gates.items()}
+
+
+def _route_path(scope):
+    for route in router.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return route.path
+    return None
+
+
+# ---------- Dependencies ----------
+# Dependencies are async so FastAPI calls them inline instead of via the threadpool.
+async def get_config(request: Request) -> AppConfig:
+    return request.app.state.config
+
+
+async def get_catalogue(request: Request) -> Catalogue:
+    # Handlers await only the views they use, via Catalogue.view.
+    return request.app.state.catalogue
+
+
+async def require_admin(request: Request, config: AppConfig = Depends(get_config)):
+    # Without a configured token the admin routes stay closed rather than open to anyone.
+    if config.admin_token is None:
+        raise HTTPException(status_code=403, detail="Admin API disabled: no admin token configured")
+    if request.headers.get("X-Admin-Token") != config.admin_token:
+        raise HTTPException(status_code=403, detail="Admin token required")
 
 
-@app.post("/api/feedback")
-async def submit_feedback(feedback: Feedback):
-    feedback_list = load_feedback()
+# ---------- Routes ----------
+router = APIRouter()
+
+# Seconds a cached response may be served; writes invalidate sooner.
+RECIPES_CACHE_TTL = 60
+FEEDBACK_STATS_CACHE_TTL = 5
+
+
+@router.get("/", response_class=HTMLResponse)
+async def serve_frontend(catalogue: Catalogue = Depends(get_catalogue),
+                         config: AppConfig = Depends(get_config)):
+    before, after = await catalogue.view("page_parts")
+    total_feedback = (await current_feedback_stats(config.feedback_file))["total_feedback"]
+    return HTMLResponse(f"{before}{total_feedback}{after}")
+
+
+@router.get("/api/recipes", response_class=FastJSONResponse)
+async def get_recipes(request: Request,
+                      max_time: Optional[float] = Query(None, ge=0, description="Maximum minutes"),
+                      min_rating: Optional[float] = Query(None, ge=0, le=5),
+                      max_calories: Optional[int] = Query(None, ge=0),
+                      type: Optional[str] = None,
+                      difficulty: Optional[str] = None,
+                      sort: Optional[str] = Query(None, pattern=r"^-?(rating|time|calories)$"),
+                      catalogue: Catalogue = Depends(get_catalogue)):
+    if max_time is None and min_rating is None and max_calories is None \
+            and type is None and difficulty is None and sort is None:
+        return FastJSONResponse(await catalogue.view("recipes_json"))
+    await catalogue.view("recipe_json_rows")
+    columns = await catalogue.view("columns")
+    type, difficulty = type and type.lower(), difficulty and difficulty.lower()
+    key = (max_time, min_rating, max_calories, type, difficulty, sort)
+    return cached_json(request, RECIPES_CACHE_TTL, key, lambda: catalogue.rows_json(columns.select(
+        max_time=max_time, min_rating=min_rating, max_calories=max_calories,
+        type=type, difficulty=difficulty, sort=sort)), catalogue)
+
+
+@router.get("/api/recipes/changes")
+async def recipe_changes(request: Request,
+                         since: int = Query(0, ge=0, description="Catalogue version the client already has"),
+                         epoch: Optional[str] = Query(None, description="Epoch that version belongs to"),
+                         catalogue: Catalogue = Depends(get_catalogue)):
+    changes = None
+    if epoch == catalogue.epoch:
+        changes = request.app.state.change_log.since(since, catalogue.version)
+    await catalogue.view("recipe_json_rows")
+    head = json_dumps({"epoch": catalogue.epoch, "version": catalogue.version, "full": changes is None})[:-1]
+    if changes is None:
+        return FastJSONResponse(head + b',"recipes":' + await catalogue.view("recipes_json") + b"}")
+    added, updated, deleted = changes
+    positions = catalogue.positions
+    return FastJSONResponse(head + b',"added":%s,"updated":%s,"deleted":%s}' % (
+        catalogue.rows_json(sorted(positions[i] for i in added)),
+        catalogue.rows_json(sorted(positions[i] for i in updated)),
+        json_dumps(deleted)))
+
+
+@router.get("/api/recipes/suggest")
+async def suggest_recipes(prefix: str = Query(..., max_length=100),
+                          limit: int = Query(SUGGEST_TOP_K, ge=1, le=SUGGEST_TOP_K),
+                          catalogue: Catalogue = Depends(get_catalogue)):
+    index = await catalogue.view("suggest_index")
+    return FastJSONResponse(index.suggest(prefix, limit))
+
+
+@router.get("/api/recipes/match")
+async def match_recipes(request: Request,
+                        have: str = Query(..., description="Comma-separated ingredients on hand"),
+                        limit: int = Query(20, ge=1, le=100),
+                        catalogue: Catalogue = Depends(get_catalogue)):
+    ingredients = [item for item in have.split(",") if item.strip()]
+    index = await catalogue.view("ingredient_index")
+    key = (index.query_mask(ingredients), limit)
+    return cached_json(request, RECIPES_CACHE_TTL, key, lambda: index.match(ingredients, limit), catalogue)
+
+
+@router.get("/api/shopping-list")
+async def shopping_list(request: Request,
+                        recipes: str = Query(..., description="Comma-separated recipe ids, each optionally "
+                                                               "id:multiplier, e.g. 1,4:2,7:0.5"),
+                        catalogue: Catalogue = Depends(get_catalogue)):
+    try:
+        wanted = [(int(recipe_id), float(multiplier or 1))
+                  for recipe_id, _, multiplier in (item.strip().partition(":")
+                                                   for item in recipes.split(",") if item.strip())]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Expected id or id:multiplier items")
+    if not wanted or not all(math.isfinite(multiplier) and multiplier > 0 for _, multiplier in wanted):
+        raise HTTPException(status_code=422, detail="Expected at least one recipe with a positive multiplier")
+    _require_recipes(*(recipe_id for recipe_id, _ in wanted))(catalogue)
+
+    parsed = await catalogue.view("parsed_ingredients")
+
+    def build():
+        totals = {}
+        for recipe_id, multiplier in wanted:
+            for quantity, unit, item in parsed[recipe_id]:
+                key = (item, unit)
+                entry = totals.get(key)
+                if entry is None:
+                    entry = totals[key] = {"item": item, "quantity": None, "unit": unit, "recipes": []}
+                if quantity is not None:
+                    entry["quantity"] = (entry["quantity"] or 0) + quantity * multiplier
+                if recipe_id not in entry["recipes"]:
+                    entry["recipes"].append(recipe_id)
+        items = sorted(totals.values(), key=lambda e: (e["item"], e["unit"] or ""))
+        for entry in items:
+            if entry["quantity"] is not None:
+                entry["quantity"] = round(entry["quantity"], 2)
+        return {"recipes": len(wanted), "items": items}
+
+    return cached_json(request, RECIPES_CACHE_TTL, tuple(wanted), build, catalogue)
+
+
+@router.get("/api/recipes/{recipe_id}/similar")
+async def similar_recipes(recipe_id: int, limit: int = Query(SIMILAR_TOP_K, ge=1, le=SIMILAR_TOP_K),
+                          catalogue: Catalogue = Depends(get_catalogue)):
+    if recipe_id not in catalogue.by_id:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    index = await catalogue.view("similarity_index")
+    return FastJSONResponse([
+        {"recipe": catalogue.by_id[other].model_dump(), "similarity": score}
+        for score, other in index.similar(recipe_id, limit)
+    ])
+
+
+@router.get("/api/recipes/{recipe_id}", response_class=FastJSONResponse)
+async def get_recipe(recipe_id: int, catalogue: Catalogue = Depends(get_catalogue)):
+    recipe = catalogue.by_id.get(recipe_id)
+    if recipe is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return FastJSONResponse(recipe.model_dump())
+
+
+@router.post("/api/feedback")
+async def submit_feedback(feedback: Feedback, request: Request, config: AppConfig = Depends(get_config)):
+    request.app.state.feedback_guard.check(request.client.host if request.client else "unknown", feedback)
 
     # Update timestamp
     feedback.timestamp = datetime.now().isoformat()
 
-    feedback_list.append(feedback)
-    save_feedback(feedback_list)
+    def append():
+        feedback_list = load_feedback(config.feedback_file)
+        feedback_list.append(feedback)
+        if save_feedback(config.feedback_file, feedback_list):
+            remember_feedback_stats(config.feedback_file, feedback_list)
 
-    return {"message": "Feedback submitted successfully"}
+    # File I/O runs off the event loop; the lock keeps concurrent writers from losing entries.
+    async with request.app.state.feedback_lock:
+        await asyncio.get_running_loop().run_in_executor(None, append)
+    bump_feedback_version(request.app)
 
+    return FastJSONResponse({"message": "Feedback submitted successfully"})
 
-@app.get("/api/feedback/stats")
-async def get_feedback_stats():
-    feedback_list = load_feedback()
-    total_feedback = len(feedback_list)
-    average_rating = sum(f.rating for f in feedback_list) / total_feedback if total_feedback > 0 else 0
 
-    return {
-        "total_feedback": total_feedback,
-        "average_rating": round(average_rating, 1)
-    }
+@router.get("/api/mealplan")
+async def meal_plan(request: Request,
+                    calories: int = Query(..., ge=100, le=20000, description="Daily calorie budget"),
+                    days: int = Query(7, ge=1, le=MEALPLAN_MAX_DAYS),
+                    dessert: bool = False,
+                    catalogue: Catalogue = Depends(get_catalogue)):
+    planner = await catalogue.view("meal_planner")
+
+    def build():
+        try:
+            plan = planner.plan(calories, days, dessert)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return {"calories": calories, "days": [{
+            "day": day,
+            "calories": sum(catalogue.recipes[row].calories for row in rows),
+            "meals": [{key: getattr(catalogue.recipes[row], key)
+                       for key in ("id", "name", "type", "calories", "rating", "img")} for row in rows],
+        } for day, rows in enumerate(plan, start=1)]}
+
+    return cached_json(request, RECIPES_CACHE_TTL, (calories, days, dessert), build, catalogue)
+
+
+@router.get("/api/feedback/stats")
+async def get_feedback_stats(request: Request, config: AppConfig = Depends(get_config)):
+    stats = await current_feedback_stats(config.feedback_file)
+    return cached_json(request, FEEDBACK_STATS_CACHE_TTL, (), lambda: stats)
+
+
+@router.get("/api/feedback/export", dependencies=[Depends(require_admin)])
+async def export_feedback(request: Request,
+                          format: str = Query("csv", pattern="^(csv|parquet)$"),
+                          since: Optional[datetime] = None,
+                          config: AppConfig = Depends(get_config)):
+    """Stream feedback for analytics without loading the whole log.
+
+    The generator runs in Starlette's thread pool, and a per-app semaphore
+    caps how many exports can hold worker threads at once.
+    """
+    if format == "parquet" and pyarrow is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    exports = request.app.state.export_slots
+    if not exports.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Too many exports in progress",
+                            headers={"Retry-After": "5"})
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone().replace(tzinfo=None)
+    export = export_feedback_csv if format == "csv" else export_feedback_parquet
+    media_type = "text/csv" if format == "csv" else "application/vnd.apache.parquet"
+    return ExportResponse(export(config.feedback_file, since), exports, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="feedback.{format}"'})
+
+
+@router.get("/api/feedback")
+async def get_all_feedback(config: AppConfig = Depends(get_config)):
+    # Stored feedback was validated on the way in; serve it as-is.
+    return FastJSONResponse(load_feedback_raw(config.feedback_file))
+
+
+def _require_recipes(*recipe_ids):
+    def check(catalogue):
+        missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in catalogue.by_id]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Recipes not found: {missing}")
+    return check
+
+
+@router.post("/api/recipes", status_code=201, dependencies=[Depends(require_admin)])
+async def create_recipe(recipe: Recipe, request: Request):
+    def check(catalogue):
+        if recipe.id in catalogue.by_id:
+            raise HTTPException(status_code=409, detail="Recipe id already exists")
+
+    catalogue = await write_catalogue(request.app, upserts=[recipe], check=check)
+    return FastJSONResponse({"version": catalogue.version, "recipe": recipe.model_dump()}, status_code=201)
+
+
+@router.put("/api/recipes/{recipe_id}", dependencies=[Depends(require_admin)])
+async def update_recipe(recipe_id: int, recipe: Recipe, request: Request):
+    recipe.id = recipe_id
+    catalogue = await write_catalogue(request.app, upserts=[recipe], check=_require_recipes(recipe_id))
+    return FastJSONResponse({"version": catalogue.version, "recipe": recipe.model_dump()})
+
+
+@router.delete("/api/recipes/{recipe_id}", dependencies=[Depends(require_admin)])
+async def delete_recipe(recipe_id: int, request: Request):
+    catalogue = await write_catalogue(request.app, deletes=[recipe_id], check=_require_recipes(recipe_id))
+    return FastJSONResponse({"version": catalogue.version})
+
+
+@router.post("/api/recipes/batch", dependencies=[Depends(require_admin)])
+async def batch_recipes(batch: RecipeBatch, request: Request):
+    """Apply many upserts and deletes as a single snapshot and file write."""
+    deletes = set(batch.delete)
+    catalogue = await write_catalogue(request.app, upserts=batch.upsert, deletes=deletes,
+                                      check=_require_recipes(*deletes))
+    return FastJSONResponse({"version": catalogue.version, "recipes": len(catalogue.recipes)})
+
+
+@router.post("/api/admin/reload", dependencies=[Depends(require_admin)])
+async def admin_reload(request: Request):
+    try:
+        catalogue = await reload_catalogue(request.app)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Catalogue not reloaded: {e}")
+    return FastJSONResponse({"version": catalogue.version, "recipes": len(catalogue.recipes)})
+
+
+@router.get("/api/admin/stats", dependencies=[Depends(require_admin)])
+async def admin_stats(request: Request):
+    return FastJSONResponse({
+        "catalogue_version": request.app.state.catalogue.version,
+        "feedback_version": request.app.state.feedback_version,
+        "feedback_guard": request.app.state.feedback_guard.stats(),
+        "response_cache": request.app.state.response_cache.stats(),
+        "admission": request.app.state.admission.stats(),
+        "change_log": request.app.state.change_log.stats(),
+    })
+
+
+# ---------- App Factory ----------
+def create_app(config=None):
+    """Build the application; data directory and catalogue load at startup."""
+    config = config or AppConfig()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        os.makedirs(config.data_dir, exist_ok=True)
+        app.state.catalogue = Catalogue(iter_recipe_file(config.recipes_file),
+                                        epoch=file_epoch(config.recipes_file))
+        app.state.recipes_file_signature = _file_signature(config.recipes_file)
+        app.state.change_log = ChangeLog(app.state.catalogue.version, config.change_log_size)
+        app.state.write_lock = asyncio.Lock()
+        # Start building every derived view off the event loop; startup does
+        # not wait, and each request waits only for the views it needs.
+        for name in Catalogue.VIEWS:
+            app.state.catalogue.building(name)
+        watcher = None
+        if config.reload_interval > 0:
+            watcher = asyncio.create_task(watch_recipes_file(app, config.reload_interval))
+        yield
+        if watcher is not None:
+            watcher.cancel()
+
+    app = FastAPI(title="FlavorFinds", version="2.0", lifespan=lifespan,
+                  default_response_class=FastJSONResponse)
+    app.state.config = config
+    app.state.export_slots = threading.BoundedSemaphore(config.max_concurrent_exports)
+    app.state.feedback_guard = FeedbackGuard(config)
+    app.state.response_cache = ResponseCache(config.response_cache_size, config.response_cache_bytes)
+    app.state.feedback_version = 0
+    app.state.feedback_lock = asyncio.Lock()
+    app.state.admission = AdmissionController(config)
+    app.include_router(router)
+
+    @app.middleware("http")
+    async def admission_control(request: Request, call_next):
+        path = _route_path(request.scope)
+        if path is None:
+            return await call_next(request)
+        gate = app.state.admission.gate(request.method, path)
+        try:
+            await gate.acquire()
+        except Overloaded as e:
+            return FastJSONResponse({"detail": "Server is busy, please retry"}, status_code=503,
+                                    headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+        start = time.monotonic()
+        try:
+            return await call_next(request)
+        finally:
+            gate.release(time.monotonic() - start)
+
+    return app
 
 
-@app.get("/api/feedback")
-async def get_all_feedback():
-    return load_feedback()
+app = create_app()
 
 
 # ---------- Port Check Function ----------